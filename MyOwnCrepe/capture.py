@@ -0,0 +1,92 @@
+import numpy as np
+
+RATE = 44100
+
+
+class CaptureBuffer:
+    """
+    Growable int16 store for a whole recording session.
+
+    Samples are copied into a preallocated array (or a memory-mapped file
+    when `path` is given) that doubles when full, so capture doesn't allocate
+    a new object per buffer and stopping doesn't need a join. Only the record
+    thread writes, and it publishes `length` after the copy, so readers can
+    take `view()` at any time without a lock. Views are zero-copy and stay
+    valid after the buffer grows.
+
+    When `max_seconds` is reached further buffers are dropped and counted in
+    `dropped_buffers` instead of growing without bound.
+    """
+
+    def __init__(self, rate=RATE, initial_seconds=60, max_seconds=None, path=None):
+        self.rate = rate
+        self.path = path
+        self.max_samples = int(max_seconds * rate) if max_seconds else None
+        self.length = 0
+        self.buffers = 0
+        self.dropped_buffers = 0
+        self.grow_count = 0
+        self._data = self._allocate(int(initial_seconds * rate))
+
+    def _allocate(self, capacity):
+        if self.path is None:
+            return np.zeros(capacity, dtype=np.int16)
+        with open(self.path, 'ab') as f:
+            f.truncate(capacity * 2)
+        return np.memmap(self.path, dtype=np.int16, mode='r+', shape=(capacity,))
+
+    def _grow(self, needed):
+        capacity = len(self._data)
+        while capacity < needed:
+            capacity *= 2
+        if self.max_samples:
+            capacity = min(capacity, self.max_samples)
+        if self.path is None:
+            data = np.zeros(capacity, dtype=np.int16)
+            data[:self.length] = self._data[:self.length]
+        else:
+            self._data.flush()
+            data = self._allocate(capacity)
+        self._data = data
+        self.grow_count += 1
+
+    def append(self, data):
+        """
+        Store one buffer of int16 PCM (bytes or array). Returns a view of the
+        stored samples, or None if the buffer was dropped.
+        """
+        samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data
+        end = self.length + len(samples)
+        if self.max_samples and end > self.max_samples:
+            self.dropped_buffers += 1
+            return None
+        if end > len(self._data):
+            self._grow(end)
+
+        stored = self._data[self.length:end]
+        stored[:] = samples
+        self.length = end
+        self.buffers += 1
+        return stored
+
+    def view(self):
+        """Zero-copy view of everything captured so far."""
+        return self._data[:self.length]
+
+    def close(self):
+        if self.path is not None:
+            self._data.flush()
+            with open(self.path, 'ab') as f:
+                f.truncate(self.length * 2)
+
+    def metrics(self):
+        return {
+            'seconds': self.length / self.rate,
+            'samples': self.length,
+            'buffers': self.buffers,
+            'dropped_buffers': self.dropped_buffers,
+            'grow_count': self.grow_count,
+            'capacity_seconds': len(self._data) / self.rate,
+            'memory_mapped': self.path is not None,
+        }
+
@@ -0,0 +1,259 @@
+"""
+Live pitch tracking: analyze audio while it is being recorded.
+
+Capture threads push 1024-sample buffers into a RingBuffer; LivePitchTracker
+runs CREPE on the newest complete frames every `hop_seconds` and publishes
+notes as soon as they are closed. Sources are pluggable, so a WAV file replayed
+at real time can stand in for the microphone:
+
+    python live.py ../audio/dakitiInCulc.wav
+"""
+import os
+import queue
+import sys
+import threading
+import time as clock
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.notes import NoteTrack
+from app.scheduler import crepe_predict
+from app.segmentation import NoteSegmenter
+
+RATE = 44100
+FRAMES_PER_BUFFER = 1024
+# Frames of audio kept on either side of the frames being analyzed, as in app.vad
+CONTEXT_FRAMES = 8
+
+
+class MicrophoneSource:
+    """Default input device through PyAudio, read in FRAMES_PER_BUFFER blocks."""
+
+    def __init__(self, rate=RATE, frames_per_buffer=FRAMES_PER_BUFFER):
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.audio = None
+        self.stream = None
+        self.overflows = 0
+
+    def open(self):
+        import pyaudio
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                      frames_per_buffer=self.frames_per_buffer)
+
+    def read(self):
+        import pyaudio
+        try:
+            return self.stream.read(self.frames_per_buffer, exception_on_overflow=True)
+        except OSError as e:
+            if e.errno != pyaudio.paInputOverflowed:
+                raise
+            # The device dropped input because we read too slowly; count it and carry on
+            self.overflows += 1
+            return self.stream.read(self.frames_per_buffer, exception_on_overflow=False)
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
+
+
+class WavFileSource:
+    """Replays a WAV file as if it were being recorded, optionally at real time."""
+
+    def __init__(self, file_path, realtime=True, frames_per_buffer=FRAMES_PER_BUFFER):
+        self.file_path = file_path
+        self.realtime = realtime
+        self.frames_per_buffer = frames_per_buffer
+        self.rate = None
+        self.samples = None
+
+    def open(self):
+        from scipy.io import wavfile
+        self.rate, audio = wavfile.read(self.file_path)
+        if len(audio.shape) > 1:
+            audio = audio.mean(axis=1)
+        if audio.dtype != np.int16:
+            scale = 32767 if audio.dtype.kind == 'f' else 32767 / np.iinfo(audio.dtype).max
+            audio = np.clip(audio * scale, -32768, 32767)
+        self.samples = audio.astype(np.int16)
+        self._position = 0
+        self._started = clock.monotonic()
+
+    def read(self):
+        """Next block as int16 bytes, or b'' once the file is exhausted."""
+        block = self.samples[self._position:self._position + self.frames_per_buffer]
+        self._position += len(block)
+        if self.realtime:
+            delay = self._started + self._position / self.rate - clock.monotonic()
+            if delay > 0:
+                clock.sleep(delay)
+        return block.tobytes()
+
+    def close(self):
+        self.samples = None
+
+
+class RingBuffer:
+    """
+    Fixed-size int16 sample buffer between one writer and one reader.
+
+    Positions are absolute sample counts since the start of the stream. When
+    the writer laps the reader the oldest samples are overwritten and
+    `overruns` counts how many were lost.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.overruns = 0
+
+    def write(self, samples):
+        samples = samples[-self.capacity:]
+        with self._lock:
+            start = self.written % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+            self.written += len(samples)
+
+    def read(self, start, end):
+        """Copy of samples [start, end); the part already overwritten is dropped and counted."""
+        with self._lock:
+            oldest = max(0, self.written - self.capacity)
+            if start < oldest:
+                self.overruns += oldest - start
+                start = oldest
+            end = min(end, self.written)
+            index = np.arange(start, end) % self.capacity
+            return start, self._data[index]
+
+
+class LivePitchTracker:
+    """
+    Incremental CREPE inference and note detection on a growing stream.
+
+    `push` is called from the capture thread. A consumer thread waits for
+    `hop_seconds` of new audio, runs CREPE on the frames that are now complete
+    (plus a little context), feeds them to a NoteSegmenter and publishes each
+    closed note on `notes` and to `on_note`. If inference falls more than
+    `max_latency` behind the capture, the tracker skips ahead so the delay
+    stays bounded; skipped audio is counted in `skipped_seconds`.
+    """
+
+    def __init__(self, rate=RATE, on_note=None, model_capacity='tiny', step_size=10, hop_seconds=0.1,
+                 max_latency=1.0, threshold=0.82, buffer_seconds=10):
+        self.rate = rate
+        self.on_note = on_note
+        self.model_capacity = model_capacity
+        self.step_size = step_size
+        self.hop_seconds = hop_seconds
+        self.max_latency = max_latency
+        self.ring = RingBuffer(int(buffer_seconds * rate))
+        self.segmenter = NoteSegmenter(threshold=threshold)
+        self.notes = queue.Queue()
+        self.latencies = []
+        self.skipped_seconds = 0.0
+        self._new_audio = threading.Event()
+        self._running = False
+        self._started = None
+        self._next_frame = 0
+
+    def start(self):
+        from crepe.core import build_and_load_model
+        build_and_load_model(self.model_capacity)  # load before capture so the first hop isn't stalled
+        self._running = True
+        self._started = clock.monotonic()
+        self._thread = threading.Thread(target=self._consume, name='live-pitch', daemon=True)
+        self._thread.start()
+
+    def push(self, samples):
+        self.ring.write(samples)
+        self._new_audio.set()
+
+    def stop(self):
+        self._running = False
+        self._new_audio.set()
+        self._thread.join()
+        self._analyze(final=True)
+        self._publish(self.segmenter.finish())
+
+    def run(self, source):
+        """Capture from `source` until it runs dry, tracking pitch as it goes."""
+        source.open()
+        self.rate = source.rate
+        self.start()
+        try:
+            while True:
+                data = source.read()
+                if not data:
+                    break
+                self.push(np.frombuffer(data, dtype=np.int16))
+        finally:
+            source.close()
+            self.stop()
+
+    def _consume(self):
+        hop_samples = int(self.hop_seconds * self.rate)
+        analyzed = 0
+        while self._running:
+            self._new_audio.wait(timeout=self.hop_seconds)
+            self._new_audio.clear()
+            if self.ring.written - analyzed >= hop_samples:
+                analyzed = self.ring.written
+                self._analyze()
+
+    def _analyze(self, final=False):
+        hop = self.rate * self.step_size / 1000.0
+        available = self.ring.written
+
+        # Skip ahead rather than let the backlog (and the latency) grow without bound
+        behind = available / self.rate - self._next_frame * self.step_size / 1000.0
+        if behind > self.max_latency:
+            skip = int((behind - self.max_latency) * 1000 / self.step_size)
+            self._next_frame += skip
+            self.skipped_seconds += skip * self.step_size / 1000.0
+
+        # A frame is complete once the audio it (and its context) covers has arrived
+        last = 1 + int(available / hop) if final else int(available / hop) - CONTEXT_FRAMES + 1
+        first = self._next_frame
+        if last <= first:
+            return
+
+        begin, audio = self.ring.read(max(0, int(round((first - CONTEXT_FRAMES) * hop))),
+                                      int(round((last - 1 + CONTEXT_FRAMES) * hop)) + 1)
+        if len(audio) == 0:
+            return
+        time, frequency, confidence, _ = crepe_predict(audio, self.rate, model_capacity=self.model_capacity,
+                                                       viterbi=False, step_size=self.step_size)
+
+        offset = int(round(begin / hop))
+        keep = slice(max(0, first - offset), last - offset)
+        time = (offset + np.arange(len(time)))[keep] * self.step_size / 1000.0
+        self._next_frame = last
+
+        self._publish(self.segmenter.feed(time, frequency[keep], confidence[keep]))
+        if len(time):
+            self._publish(self.segmenter.close_stale(time[-1]))
+
+    def _publish(self, notes):
+        now = clock.monotonic()
+        track = NoteTrack(*notes)
+        for end_time, note in zip(track.end.tolist(), track.to_dicts()):
+            # Delay between the note ending in the audio and the note being published
+            self.latencies.append(now - (self._started + end_time))
+            self.notes.put(note)
+            if self.on_note:
+                self.on_note(note)
+
+
+if __name__ == '__main__':
+    tracker = LivePitchTracker(on_note=lambda note: print(f"{note['startTime']:7.2f}s  {note['name']:<4} "
+                                                          f"{note['duration']:.2f}s"))
+    tracker.run(WavFileSource(sys.argv[1]) if len(sys.argv) > 1 else MicrophoneSource())
+    if tracker.latencies:
+        print(f"Median latency {np.median(tracker.latencies):.3f} s, max {max(tracker.latencies):.3f} s")
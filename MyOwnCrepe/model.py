@@ -1,40 +1,59 @@
-import crepe
-from scipy.io import wavfile
-from scipy import signal
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-
-
-def frequency_to_note(freq):
-    A4 = 440.0
-    C0 = A4 * pow(2, -4.75)
-    note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    h = round(12 * np.log2(freq / C0))
-    octave = h // 12
-    n = h % 12
-    return note_names[n] + str(octave)
-
-
-from ruptures import Pelt
 
+# Share the service's note grouping; this folder is run as scripts from inside it
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.changepoint import PeltL2
+from app.config import AnalysisConfig
+from app.notes import NoteTrack
+from app.scheduler import crepe_predict
+from app.segmentation import segment_notes
+from app.tracks import load_track
+from app.vad import predict_voiced
+
+
+def analyze_and_plot_audio(file_path, median_window=99, min_size=10, penalty=10, config=None, track=None):
+    config = config or AnalysisConfig(model_capacity='full', confidence_threshold=0.85)
+
+    # Predict the pitch, or reuse a pitch track (dict or saved directory) to only redo the segmentation
+    if track is None:
+        track = compute_track(file_path, config)
+    elif isinstance(track, str):
+        track = load_track(track)
+    time, frequency, frequency_median = filter_frequency(track['time'], track['frequency'], track['confidence'],
+                                                        config.confidence_threshold, median_window)
+    segmented_frequency = segment_frequency(frequency_median, penalty, min_size)
+
+    # Plot the results (matplotlib is only imported when a plot is drawn)
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(12, 6))
+    plt.scatter(time, frequency, s=1, alpha=0.5, label='Original', color='blue')
+    plt.scatter(time, segmented_frequency, s=2, label='Segmented', color='red')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Frequency (Hz)')
+    plt.title(f'Pitch Detection Results (Median Window: {median_window}, Penalty: {penalty})')
+    plt.legend()
+    plt.grid(True)
+    plt.show()
 
-def analyze_and_plot_audio(file_path, median_window=99, min_size=10, penalty=10):
-    # Load the file
-    sr, audio = wavfile.read(file_path)
+    return time, segmented_frequency
 
-    # Predict the pitch
-    time, frequency, confidence, _ = crepe.predict(audio, sr, viterbi=True, model_capacity='full')
 
+def filter_frequency(time, frequency, confidence, threshold, median_window):
     # Filter out low confidence predictions
-    high_confidence = confidence > 0.85
+    high_confidence = confidence > threshold
     time = time[high_confidence]
     frequency = frequency[high_confidence]
 
     # Apply median filter
-    frequency_median = signal.medfilt(frequency, kernel_size=median_window)
+    from scipy import signal
+    return time, frequency, signal.medfilt(frequency, kernel_size=median_window)
 
-    # Detect change points
-    algo = Pelt(model="l2").fit(frequency_median.reshape(-1, 1))
+
+def segment_frequency(frequency_median, penalty, min_size):
+    # Detect change points (same breakpoints as ruptures' Pelt(model="l2"), with O(1) segment costs)
+    algo = PeltL2().fit(frequency_median.reshape(-1, 1))
     change_points = algo.predict(pen=penalty)
 
     # Segment the pitch data
@@ -42,89 +61,43 @@ def analyze_and_plot_audio(file_path, median_window=99, min_size=10, penalty=10)
     for start, end in zip([0] + change_points, change_points + [len(frequency_median)]):
         if end - start >= min_size:  # Only keep segments of a minimum size
             segmented_frequency[start:end] = np.median(frequency_median[start:end])
+    return segmented_frequency
 
-    # Plot the results
-    plt.figure(figsize=(12, 6))
-    plt.scatter(time, frequency, s=1, alpha=0.5, label='Original', color='blue')
-    plt.scatter(time, segmented_frequency, s=2, label='Segmented', color='red')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Frequency (Hz)')
-    plt.title(f'Pitch Detection Results (Median Window: {median_window}, Penalty: {penalty})')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
 
-    return time, segmented_frequency
+def predict_pitch(audio, sr, config):
+    return crepe_predict(audio, sr, viterbi=config.viterbi, model_capacity=config.model_capacity,
+                         step_size=config.step_size)
+
+
+def compute_track(file_path, config):
+    # Load the file
+    from scipy.io import wavfile
+    sr, file = wavfile.read(file_path)
 
+    # Predict the pitch, skipping silent stretches if config.vad is set
+    time, frequency, confidence, activation = predict_voiced(file, sr, config, predict_pitch)
+    return {
+        'time': time,
+        'frequency': frequency,
+        'confidence': confidence,
+        'meta': {'sampleRate': int(sr), 'duration': len(file) / sr, 'frames': len(time), **config.pitch_params()},
+    }
+
+
+def analyze_audio(file_path, config=None):
+    config = config or AnalysisConfig(model_capacity='full')
+    return notes_from_track(compute_track(file_path, config), config)
+
+
+def notes_from_track(track, config):
+    # Filter by confidence, group frequencies into notes and drop the short ones
+    start_times, end_times, frequencies = segment_notes(track['time'], track['frequency'], track['confidence'],
+                                                        **config.segmentation_params())
+
+    # Match the weighted average frequency of each note with its initial and ending time
+    return NoteTrack(start_times, end_times, frequency=frequencies).to_dicts()
 
 
 if __name__ == '__main__':
     file_path = '../audio/voice_recording.wav'
     analyze_and_plot_audio(file_path, median_window=21, min_size=10, penalty=5)
-
-def analyze_audio(file_path):
-    # Load the file
-    sr, file = wavfile.read(file_path)
-
-    # Predict the pitch
-    time, frequency, confidence, activation = crepe.predict(file, sr, viterbi=True, model_capacity='full')
-
-    # Create an array of tuples and filter by confidence
-    data = [(t, f, c) for t, f, c in zip(time, frequency, confidence) if c > 0.82]
-
-    # Extract the filtered values
-    filtered_time = [d[0] for d in data]
-    filtered_frequency = [d[1] for d in data]
-    filtered_confidence = [d[2] for d in data]
-
-    # Group frequencies into notes
-    notes = []
-    current_note = []
-    prev_f = None
-    prev_t = None
-    note_diff = None
-
-    for i in range(len(filtered_time)):
-        if i != 0:
-            note_diff = abs((filtered_frequency[i] - prev_f) / (filtered_time[i] - prev_t))
-        if not current_note:
-            current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
-        else:
-            time_diff = filtered_time[i] - current_note[-1][0]
-            if time_diff <= 0.1 and note_diff is not None and note_diff < 180:
-                current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
-            else:
-                notes.append(current_note)
-                current_note = [(filtered_time[i], filtered_frequency[i], filtered_confidence[i])]
-        prev_t = filtered_time[i]
-        prev_f = filtered_frequency[i]
-
-    if current_note:
-        notes.append(current_note)
-
-    long_notes = []
-    for note_array in notes:
-        time_last, freq_last, conf_last = note_array[-1]
-        time_first, freq_first, conf_first = note_array[0]
-        if (time_last - time_first) > 0.05:
-            long_notes.append(note_array)
-
-    notes = long_notes
-
-    # Calculate weighted average of frequencies for each note and match with initial and ending time
-    weighted_averages = []
-    for note in notes:
-        times, freqs, confs = zip(*note)
-        weighted_avg_freq = np.average(freqs, weights=confs)
-        start_time = times[0]
-        end_time = times[-1]
-        duration = end_time - start_time
-        musical_note = frequency_to_note(weighted_avg_freq)
-        weighted_averages.append({
-            "name": musical_note,
-            "duration": duration,
-            "frequency": weighted_avg_freq,
-            "startTime": start_time
-        })
-
-    return weighted_averages
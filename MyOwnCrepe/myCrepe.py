@@ -1,114 +1,143 @@
-import crepe
-from scipy.io import wavfile
-import matplotlib.pyplot as plt
+import os
+import sys
 import numpy as np
-from matplotlib.widgets import Slider, Button
 
-def plot_pitch_and_notes(t, f, c, notes, ax1, ax2):
-    ax1.clear()
-    ax2.clear()
-    scatter = ax1.scatter(t, f, c=c, cmap='viridis', vmin=0.8, vmax=1.0)
-    midi_min, midi_max = int(min(f)), int(max(f)) + 1
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.notes import NoteTrack
+from app.pitch import frequency_to_midi
+from app.scheduler import crepe_predict
+
+def plot_pitch(t, f, c, ax1, ax2):
+    # Points and grid are drawn once; slider updates only touch the line returned here
+    midi_min, midi_max = int(np.nanmin(f)), int(np.nanmax(f)) + 1
     midi_lines = range(midi_min, midi_max + 1)
-    ax1.hlines(midi_lines, min(t), max(t), colors='gray', alpha=0.3, linestyles='dashed')
     midi_labels = [f"{midi}" for midi in midi_lines[::2]]
-    ax1.set_yticks(midi_lines[::2])
-    ax1.set_yticklabels(midi_labels)
-    ax1.set_title('Pitch Data Points with Confidence (≥ 0.8)')
-    ax1.set_ylabel('MIDI Note')
-    
+    ax1.scatter(t, f, c=c, cmap='viridis', vmin=0.8, vmax=1.0)
     ax2.scatter(t, f, c=c, cmap='viridis', vmin=0.8, vmax=1.0, alpha=0.5)
-    for note in notes:
-        ax2.plot([note['start_time'], note['end_time']], [note['midi'], note['midi']], linewidth=2, color='red', alpha=0.7)
-    ax2.hlines(midi_lines, min(t), max(t), colors='gray', alpha=0.3, linestyles='dashed')
-    ax2.set_yticks(midi_lines[::2])
-    ax2.set_yticklabels(midi_labels)
+    for ax in (ax1, ax2):
+        ax.hlines(midi_lines, np.min(t), np.max(t), colors='gray', alpha=0.3, linestyles='dashed')
+        ax.set_yticks(midi_lines[::2])
+        ax.set_yticklabels(midi_labels)
+        ax.set_ylabel('MIDI Note')
+    ax1.set_title('Pitch Data Points with Confidence (≥ 0.8)')
     ax2.set_title('Identified Notes')
     ax2.set_xlabel('Time (seconds)')
-    ax2.set_ylabel('MIDI Note')
+    notes_line, = ax2.plot([], [], linewidth=2, color='red', alpha=0.7)
+    return notes_line
+
+def plot_notes(notes_line, notes):
+    # All notes as one polyline broken by NaNs, so redrawing them is a single set_data
+    notes_line.set_data(*notes.segments())
 
 def linearize(freq):
-    if freq <= 0:
-        return None
-    midi_note = 69 + 12 * np.log2(freq / 440.0)
-    return midi_note
+    # Fractional MIDI note numbers; NaN where there is no pitch
+    freq = np.asarray(freq, dtype=np.float64)
+    return np.where(freq > 0, frequency_to_midi(freq), np.nan)
 
 def filter_data(t, f, c, threshold):
-    return [(t[i], f[i], c[i]) for i in range(len(t)) if c[i] >= threshold]
-
-def calculate_weighted_slope(dt, df, c1, c2):
-    avg_confidence = (c1 + c2) / 2
-    confidence_factor = 1 - avg_confidence  # Invert confidence to increase slope for low confidence
-    weighted_slope = abs(df / dt) * (1 + confidence_factor)
-    return weighted_slope
-
-def add_point(note, t, f, c, dt, df, time_th, ext_time_th, pitch_th, max_slope):
-    if dt > time_th:
-        if abs(df) <= pitch_th and dt <= ext_time_th:
-            note.append((t, f, c))
-            return note, True
-    else:
-        if len(note) > 0:
-            weighted_slope = calculate_weighted_slope(dt, df, note[-1][2], c)
-            if weighted_slope <= max_slope:
-                note.append((t, f, c))
-                return note, True
-    return note, False
-
-def finalize(note, notes, min_points):
-    if len(note) >= min_points:
-        notes.append(note)
-    return notes, []
-
-def process_notes(notes):
-    processed = []
-    for note in notes:
-        midi_vals = np.array([point[1] for point in note])
-        confidences = np.array([point[2] for point in note])
-        weighted_log = np.sum(np.log(midi_vals) * confidences) / np.sum(confidences)
-        weighted_mean_midi = np.exp(weighted_log)
-        start = note[0][0]
-        end = note[-1][0]
-        avg_conf = np.mean(confidences)
-        processed.append({
-            'midi': weighted_mean_midi,
-            'start_time': start,
-            'end_time': end,
-            'confidence': avg_conf
-        })
-    return processed
+    keep = np.asarray(c) >= threshold
+    return np.asarray(t)[keep], np.asarray(f)[keep], np.asarray(c)[keep]
+
+def linearized_data(time, freq, conf, threshold):
+    # Confident frames only, with the pitch as a (fractional) MIDI note number
+    t, f, c = filter_data(time, freq, conf, threshold)
+    return t, linearize(f), c
+
+class NotesBlitter:
+    """
+    Redraws only the notes line and the sliders over a cached image of the
+    rest of the figure, so moving a slider doesn't re-render every pitch
+    point. Any full draw (first show, resize, zoom) refreshes the cache.
+    """
+
+    def __init__(self, fig, notes_line, slider_axes):
+        self.fig = fig
+        self.notes_line = notes_line
+        self.slider_axes = slider_axes
+        self.background = None
+        notes_line.set_animated(True)
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.notes_line.axes.draw_artist(self.notes_line)
+
+    def redraw(self):
+        canvas = self.fig.canvas
+        if self.background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        for ax in self.slider_axes:
+            self.fig.draw_artist(ax)
+        self.notes_line.axes.draw_artist(self.notes_line)
+        canvas.blit(self.fig.bbox)
+
+class NoteDetector:
+    """
+    detect_notes on arrays, for re-running with new thresholds.
+
+    A frame only ever joins the note of the confident frame before it, so
+    whether each pair of neighbours stays together depends on the thresholds
+    alone. The per-pair dt, df and weighted slope are computed once here, and
+    `detect` re-derives the split mask and the per-note averages with a few
+    vectorized passes.
+    """
+
+    def __init__(self, t, f, c, conf_th=0.8):
+        keep = np.asarray(c) >= conf_th
+        self.t = np.asarray(t, dtype=np.float64)[keep]
+        self.f = np.asarray(f, dtype=np.float64)[keep]
+        self.c = np.asarray(c)[keep]
+        self.dt = np.diff(self.t)
+        self.abs_df = np.abs(np.diff(self.f))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence_factor = 1 - (self.c[:-1] + self.c[1:]) / 2
+            self.slope = np.abs(np.diff(self.f) / self.dt) * (1 + confidence_factor)
+            self.weighted_log = np.log(self.f) * self.c
+
+    def split_mask(self, time_th, ext_time_th, pitch_th, max_slope):
+        """True for each frame that starts a new note."""
+        with np.errstate(invalid='ignore'):
+            joined = np.where(self.dt > time_th, (self.abs_df <= pitch_th) & (self.dt <= ext_time_th),
+                              self.slope <= max_slope)
+        return np.concatenate(([True], ~joined)) if len(self.t) else np.zeros(0, dtype=bool)
+
+    def detect(self, max_slope=5, min_points=4, time_th=0.05, ext_time_th=0.08, pitch_th=1.0):
+        """The notes detect_notes would find, as a NoteTrack."""
+        starts = np.flatnonzero(self.split_mask(time_th, ext_time_th, pitch_th, max_slope))
+        lengths = np.diff(np.append(starts, len(self.t)))
+        starts, lengths = starts[lengths >= min_points], lengths[lengths >= min_points]
+        if len(starts) == 0:
+            return NoteTrack.empty()
+        # Starts of kept notes interleaved with their ends, so reduceat sums each note and skips the gaps
+        bounds = np.column_stack((starts, starts + lengths)).ravel()
+        if bounds[-1] == len(self.t):
+            bounds = bounds[:-1]
+        confidence_sum = np.add.reduceat(self.c, bounds)[::2]
+        return NoteTrack(self.t[starts], self.t[starts + lengths - 1],
+                         midi=np.exp(np.add.reduceat(self.weighted_log, bounds)[::2] / confidence_sum),
+                         confidence=confidence_sum / lengths)
 
 def detect_notes(t, f, c, max_slope=5, min_points=4, time_th=0.05, ext_time_th=0.08, pitch_th=1.0, conf_th=0.8):
-    notes = []
-    note = []
-    for i in range(len(t)):
-        if c[i] < conf_th:
-            continue
-        if not note:
-            note.append((t[i], f[i], c[i]))
-        else:
-            dt = t[i] - note[-1][0]
-            df = f[i] - note[-1][1]
-            note, added = add_point(note, t[i], f[i], c[i], dt, df, time_th, ext_time_th, pitch_th, max_slope)
-            if not added:
-                notes, note = finalize(note, notes, min_points)
-                note.append((t[i], f[i], c[i]))
-    notes, _ = finalize(note, notes, min_points)
-    return process_notes(notes)
+    return NoteDetector(t, f, c, conf_th).detect(max_slope, min_points, time_th, ext_time_th, pitch_th)
 
 def main():
+    # GUI-only imports, so bench scripts can use the note detection without matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
+    from scipy.io import wavfile
+
     sr, audio = wavfile.read('voice.wav')
-    time, freq, conf, activation = crepe.predict(audio, sr, viterbi=True, model_capacity='full')
-    data = filter_data(time, freq, conf, threshold=0.8)
-    t = [d[0] for d in data]
-    f = [linearize(d[1]) for d in data]
-    c = [d[2] for d in data]
+    time, freq, conf, activation = crepe_predict(audio, sr, viterbi=True, model_capacity='full')
+    t, f, c = linearized_data(time, freq, conf, threshold=0.8)
 
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 16))
     plt.subplots_adjust(left=0.1, bottom=0.35)
 
-    initial_notes = detect_notes(t, f, c, time_th=0.05, ext_time_th=0.1, pitch_th=4.0)
-    plot_pitch_and_notes(t, f, c, initial_notes, ax1, ax2)
+    detector = NoteDetector(t, f, c)
+    notes_line = plot_pitch(t, f, c, ax1, ax2)
+    plot_notes(notes_line, detector.detect(time_th=0.05, ext_time_th=0.1, pitch_th=4.0))
 
     # Create sliders
     ax_time_th = plt.axes([0.1, 0.2, 0.65, 0.03])
@@ -121,14 +150,20 @@ def main():
     s_pitch_th = Slider(ax_pitch_th, 'Pitch Threshold', 0.5, 10.0, valinit=4.0)
     s_max_slope = Slider(ax_max_slope, 'Max Slope', 1, 50, valinit=5)
 
+    # The sliders don't trigger full redraws; update() blits them with the notes
+    sliders = [s_time_th, s_ext_time_th, s_pitch_th, s_max_slope]
+    for slider in sliders:
+        slider.drawon = False
+    blitter = NotesBlitter(fig, notes_line, [slider.ax for slider in sliders])
+
     def update(val):
         time_th = s_time_th.val
         ext_time_th = s_ext_time_th.val
         pitch_th = s_pitch_th.val
         max_slope = s_max_slope.val
-        notes = detect_notes(t, f, c, time_th=time_th, ext_time_th=ext_time_th, pitch_th=pitch_th, max_slope=max_slope)
-        plot_pitch_and_notes(t, f, c, notes, ax1, ax2)
-        fig.canvas.draw_idle()
+        notes = detector.detect(time_th=time_th, ext_time_th=ext_time_th, pitch_th=pitch_th, max_slope=max_slope)
+        plot_notes(notes_line, notes)
+        blitter.redraw()
 
     s_time_th.on_changed(update)
     s_ext_time_th.on_changed(update)
@@ -256,7 +291,7 @@ if __name__ == '__main__':
 
 #     sr, audio = wavfile.read('voice.wav')
 
-#     time, freq, conf, activation = crepe.predict(audio, sr, viterbi=True, model_capacity='full')
+#     time, freq, conf, activation = crepe_predict(audio, sr, viterbi=True, model_capacity='full')
 #     data = filter_data(time, freq, conf, threshold=0.8)
 #     t = np.array([d[0] for d in data])
 #     f = np.array([linearize(d[1]) for d in data])
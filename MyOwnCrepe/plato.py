@@ -1,47 +1,212 @@
 import argparse
+import glob
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from tabulate import tabulate
-from pprint import pprint
-from model import analyze_and_plot_audio
+import shutil
+
+# The repository root, for the app package; plato.py is run from inside this folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from model import compute_track, notes_from_track
+from app.config import CAPACITIES, PRESETS, AnalysisConfig
+from app.tracks import load_track, save_track
 """
-CLI tool to analyze audio, simplifies testing without a server.
+CLI tool to transcribe audio without a server, one file or thousands.
 To run this tool, run the following command:
     python plato.py wavfilename.wav
+    python plato.py ../audio -o transcriptions --workers 4 --format both --resume
+Inputs can be WAV files, directories of WAVs or glob patterns such as "../audio/*.wav".
+Each file gets <name>.json (and/or <name>.mid) in the output directory;
+--session-midi also collects every file of the run into one multi-track MIDI file.
+Finished files are logged to progress.jsonl there, so an interrupted run picks up
+where it left off with --resume.
+With --save-tracks the CREPE output is also kept as <name>.track; pass those
+directories back as inputs to try other segmentation settings without re-running
+the model:
+    python plato.py ../audio --save-tracks -o out
+    python plato.py "out/*.track" --threshold 0.7 -o out-0.7
 Use recorder.py to record a wav audio file.
 """
 
+PROGRESS_FILE = "progress.jsonl"
+TRACK_SUFFIX = ".track"
+
+
+def find_audio_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item) and not item.rstrip(os.sep).endswith(TRACK_SUFFIX):
+            matches = glob.glob(os.path.join(item, "*.wav")) + glob.glob(os.path.join(item, "*" + TRACK_SUFFIX))
+        else:
+            matches = glob.glob(item) or [item]
+        for path in sorted(matches):
+            path = path.rstrip(os.sep)
+            if not path.lower().endswith(('.wav', TRACK_SUFFIX)):
+                print(f"Skipping '{path}': not a .wav file or {TRACK_SUFFIX} directory")
+            elif not os.path.exists(path):
+                print(f"Skipping '{path}': file does not exist")
+            else:
+                files.append(os.path.abspath(path))
+    return list(dict.fromkeys(files))
+
+
+def file_signature(path):
+    # A file counts as done only if it hasn't changed since it was transcribed
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def load_progress(output_dir):
+    done = {}
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # half-written line from an interrupted run
+                if record.get("status") == "ok":
+                    done[record["file"]] = record["signature"]
+    return done
+
+
+def init_worker(model_capacity):
+    # Build the model once per worker process instead of once per file
+    from crepe.core import build_and_load_model
+    build_and_load_model(model_capacity)
+
+
+def transcribe(path, output_dir, formats, config, save_tracks=False, keep_notes=False):
+    started = time.perf_counter()
+    record = {"file": path, "signature": file_signature(path)}
+    try:
+        stem = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+        if path.endswith(TRACK_SUFFIX):
+            # Stage two only: the pitch track was computed by an earlier run
+            track = load_track(path)
+        else:
+            track = compute_track(path, config)
+            if save_tracks:
+                shutil.rmtree(stem + TRACK_SUFFIX, ignore_errors=True)
+                save_track(stem + TRACK_SUFFIX, track)
+        record["audio_seconds"] = track["meta"]["duration"]
+        notes = notes_from_track(track, config)
+        if "json" in formats:
+            with open(stem + ".json", "w") as f:
+                json.dump(notes, f, indent=2)
+        if "midi" in formats:
+            from app.model import export_to_midi
+            export_to_midi(notes, stem + ".mid")
+        record.update(status="ok", notes=len(notes))
+        if keep_notes:
+            record["note_list"] = notes  # for the session MIDI; not logged to progress.jsonl
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["seconds"] = time.perf_counter() - started
+    return record
+
 
 def main():
-    """
-    parser = argparse.ArgumentParser(description="Analyze an audio file.")
-    parser.add_argument("audio_file", nargs="?", help="The audio file to analyze (should be a .wav file)")
+    parser = argparse.ArgumentParser(description="Transcribe audio files to notes (JSON) and/or MIDI.")
+    parser.add_argument("inputs", nargs="*", help="WAV files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="transcriptions", help="Where to write results")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("-f", "--format", choices=["json", "midi", "both"], default="json",
+                        help="Output format per file")
+    parser.add_argument("--preset", choices=list(PRESETS), help="Accuracy/speed preset, see README")
+    parser.add_argument("--capacity", choices=CAPACITIES, help="CREPE model capacity (default: full)")
+    parser.add_argument("--step-size", type=int, help="Hop between pitch frames in ms (default: 10)")
+    parser.add_argument("--no-viterbi", action="store_true", help="Skip Viterbi smoothing")
+    parser.add_argument("--threshold", type=float, help="Confidence threshold (default: 0.82)")
+    parser.add_argument("--vad", action=argparse.BooleanOptionalAction,
+                        help="Skip CREPE on silent stretches (default: off, on for --preset realtime)")
+    parser.add_argument("--save-tracks", action="store_true",
+                        help=f"Also keep each pitch track as <name>{TRACK_SUFFIX} for later re-segmentation")
+    parser.add_argument("--resume", action="store_true", help="Skip files already transcribed in output-dir")
+    parser.add_argument("--session-midi", metavar="PATH",
+                        help="Also write the files transcribed in this run as one MIDI file, a track per file")
     args = parser.parse_args()
 
-    audio_file = args.audio_file
+    # Start from the preset (or the old defaults) and apply any explicit flags on top
+    overrides = {"model_capacity": args.capacity, "step_size": args.step_size, "confidence_threshold": args.threshold,
+                 "vad": args.vad}
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    if args.no_viterbi:
+        overrides["viterbi"] = False
+    try:
+        if args.preset:
+            config = AnalysisConfig.from_preset(args.preset, **overrides)
+        else:
+            config = AnalysisConfig(**{"model_capacity": "full", **overrides})
+    except ValueError as e:
+        parser.error(str(e))
 
-    if not audio_file:
-        audio_file = input("Please enter the name of the audio file to analyze: ")
+    inputs = args.inputs
+    if not inputs:
+        inputs = [input("Please enter the name of the audio file to analyze: ")]
 
-    # Check if the file exists
-    if not os.path.exists(audio_file):
-        print(f"Error: The file '{audio_file}' does not exist.")
+    files = find_audio_files(inputs)
+    if not files:
+        print("Error: no .wav files found.")
         sys.exit(1)
 
-    # Check if the file has a .wav extension, add it if necessary
-    if not audio_file.lower().endswith('.wav'):
-        audio_file += '.wav'
-        if not os.path.exists(audio_file):
-            print(f"Error: The file '{audio_file}' does not exist.")
-            sys.exit(1)
-"""
-    try:
-        print("Analyzing audio...")
-        file_path = os.path.join('./', "audio.wav")
-        #result = analyze_audio_dos(file_path)
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.resume:
+        done = load_progress(args.output_dir)
+        pending = [path for path in files if done.get(path) != file_signature(path)]
+        print(f"Resuming: {len(files) - len(pending)} of {len(files)} files already done.")
+        files = pending
 
-    except Exception as e:
-        print(f"An error occurred while analyzing the file: {str(e)}")
+    formats = ("json", "midi") if args.format == "both" else (args.format,)
+    workers = max(1, min(args.workers, len(files)))
+    results = []
+    session = {}
+    print(f"Transcribing {len(files)} files with {workers} workers...")
+    # Stored tracks only need segmenting, so don't load the model for them
+    needs_model = any(not path.endswith(TRACK_SUFFIX) for path in files)
+    started = time.perf_counter()
+    with open(os.path.join(args.output_dir, PROGRESS_FILE), "a") as progress, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker if needs_model else None,
+                                initargs=(config.model_capacity,) if needs_model else ()) as pool:
+        futures = {pool.submit(transcribe, path, args.output_dir, formats, config, args.save_tracks,
+                               bool(args.session_midi)): path
+                   for path in files}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                record = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. OOM-killed on a long file): its file and every unfinished one fail
+                path = futures[future]
+                record = {"file": path, "signature": file_signature(path), "status": "error",
+                          "error": f"worker process died: {e}", "seconds": 0.0}
+            if "note_list" in record:
+                session[record["file"]] = record.pop("note_list")
+            results.append(record)
+            progress.write(json.dumps(record) + "\n")
+            progress.flush()
+            print(f"[{i}/{len(files)}] {os.path.basename(record['file'])}: {record['status']} "
+                  f"({record['seconds']:.1f} s)")
+
+    if args.session_midi and session:
+        from app.model import export_session_to_midi
+        paths = sorted(session)
+        export_session_to_midi([session[path] for path in paths], args.session_midi,
+                               names=[os.path.basename(path) for path in paths])
+        print(f"Wrote {len(paths)} tracks to {args.session_midi}")
+
+    rows = [[os.path.basename(r["file"]), r["status"], f"{r.get('audio_seconds', 0):.1f}", r.get("notes", "-"),
+             f"{r['seconds']:.2f}", f"{r.get('audio_seconds', 0) / r['seconds']:.1f}x" if r["seconds"] else "-",
+             r.get("error", "")]
+            for r in sorted(results, key=lambda r: r["file"])]
+    print(tabulate(rows, headers=["File", "Status", "Audio (s)", "Notes", "Time (s)", "Speed", "Error"]))
+    failed = sum(r["status"] != "ok" for r in results)
+    print(f"{len(results) - failed} transcribed, {failed} failed in {time.perf_counter() - started:.1f} s")
+    if failed:
         sys.exit(1)
 
 
@@ -1,32 +1,61 @@
-import pyaudio
+import sys
 import wave
 import threading
-import librosa
 import numpy as np
 from testingPlayground import analyze_and_plot_audio
+from capture import CaptureBuffer
+from live import FRAMES_PER_BUFFER, RATE, LivePitchTracker, MicrophoneSource
 
-FORMAT = pyaudio.paInt16
 CHANNELS = 1
-RATE = 44100
-FRAMES_PER_BUFFER = 1024
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+def preemphasis(audio, coef=0.97):
+    """
+    Same output as librosa.effects.preemphasis(audio, coef=coef), computed in
+    place of a librosa import. The first sample uses librosa's default initial
+    filter state of 2 * audio[0] - audio[1].
+    """
+    emphasized = np.empty_like(audio)
+    emphasized[1:] = audio[1:] - audio.dtype.type(coef) * audio[:-1]
+    emphasized[:1] = audio[:1] + (2 * audio[:1] - audio[1:2])
+    return emphasized
+
+
+def write_wav(file_name, rate, samples):
+    wave_file = wave.open(file_name, 'wb')
+    wave_file.setnchannels(CHANNELS)
+    wave_file.setsampwidth(SAMPLE_WIDTH)
+    wave_file.setframerate(rate)
+    wave_file.writeframes(samples)
+    wave_file.close()
 
 
 class AudioRecorder:
-    def __init__(self, output_filename="recorded.wav", output_filename_reduced="recorded_reduced.wav"):
-        self.audio = pyaudio.PyAudio()
-        self.stream = None
-        self.frames = []
+    def __init__(self, output_filename="recorded.wav", output_filename_reduced="recorded_reduced.wav",
+                 source=None, live=False, on_note=None, capture_path=None, noise_reduce=False):
+        self.source = source
+        self.noise_reduce = noise_reduce
+        self._processed = None
+        self.capture = None
+        self.capture_path = capture_path
         self.recording = False
         self.output_filename = output_filename
         self.output_filename_reduced = output_filename_reduced
-        self.lock = threading.Lock()
+        # Live mode: analyze each buffer as it arrives instead of after stop_recording()
+        self.tracker = LivePitchTracker(RATE, on_note=on_note) if live else None
 
     def start_recording(self):
         try:
-            self.stream = self.audio.open(format=FORMAT, channels=CHANNELS,
-                                          rate=RATE, input=True,
-                                          frames_per_buffer=FRAMES_PER_BUFFER)
-            self.frames = []
+            if self.source is None:
+                self.source = MicrophoneSource(RATE, FRAMES_PER_BUFFER)
+            self.source.open()
+            # Preallocated (or memory-mapped, with capture_path) sample store, appended to without a lock
+            self.capture = CaptureBuffer(self.source.rate, path=self.capture_path)
+            self._processed = None
+            if self.tracker:
+                self.tracker.rate = self.source.rate
+                self.tracker.start()
             self.recording = True
             print("Recording...")
             self.record_thread = threading.Thread(target=self.record)
@@ -37,48 +66,72 @@ class AudioRecorder:
     def record(self):
         try:
             while self.recording:
-                data = self.stream.read(FRAMES_PER_BUFFER, exception_on_overflow=False)
-                with self.lock:
-                    self.frames.append(data)
+                data = self.source.read()
+                if not data:
+                    break
+                samples = self.capture.append(data)
+                if self.tracker and samples is not None:
+                    self.tracker.push(samples)
         except Exception as e:
             print(f"Error during recording: {e}")
 
-    def stop_recording(self):
+    def stop_recording(self, save=True):
         try:
             self.recording = False
             self.record_thread.join()
-            self.stream.stop_stream()
-            self.stream.close()
-            self.audio.terminate()
-
-            with self.lock:
-                # Save original recording
-                waveFile = wave.open(self.output_filename, 'wb')
-                waveFile.setnchannels(CHANNELS)
-                waveFile.setsampwidth(self.audio.get_sample_size(FORMAT))
-                waveFile.setframerate(RATE)
-                waveFile.writeframes(b''.join(self.frames))
-                waveFile.close()
-
-                # Load original recording for noise reduction
-                audio, sr = librosa.load(self.output_filename, sr=None)
-                audio_reduced = librosa.effects.preemphasis(audio)
-
-                # Save noise-reduced recording
-                waveFileReduced = wave.open(self.output_filename_reduced, 'wb')
-                waveFileReduced.setnchannels(CHANNELS)
-                waveFileReduced.setsampwidth(self.audio.get_sample_size(FORMAT))
-                waveFileReduced.setframerate(sr)
-                waveFileReduced.writeframes(np.int16(audio_reduced * 32767).tobytes())
-                waveFileReduced.close()
+            self.source.close()
+            if self.tracker:
+                self.tracker.stop()
+            self.capture.close()
+
+            if save:
+                self.save()
 
             print("Finished recording.")
+            print(self.metrics())
         except Exception as e:
             print(f"Failed to stop recording: {e}")
 
+    def recorded_audio(self):
+        """(sample rate, int16 samples) of the raw take, as a zero-copy view of the capture buffer."""
+        return self.source.rate, self.capture.view()
+
+    def processed_audio(self):
+        """(sample rate, float32 samples) after pre-emphasis and, if enabled, noise reduction."""
+        if self._processed is None:
+            rate, samples = self.recorded_audio()
+            audio = samples.astype(np.float32) / 32768
+            if self.noise_reduce:
+                import noisereduce
+                audio = noisereduce.reduce_noise(y=audio, sr=rate).astype(np.float32)
+            self._processed = preemphasis(audio)
+        return self.source.rate, self._processed
+
+    def save(self):
+        """Write the original and the processed recording, each in a single pass from memory."""
+        rate, samples = self.recorded_audio()
+        write_wav(self.output_filename, rate, samples)
+
+        rate, processed = self.processed_audio()
+        write_wav(self.output_filename_reduced, rate, np.int16(processed * 32767))
+
+    def metrics(self):
+        """Capture health: dropped buffers, device overflows and live ring buffer overruns."""
+        metrics = self.capture.metrics() if self.capture else {}
+        metrics['input_overflows'] = getattr(self.source, 'overflows', 0)
+        if self.tracker:
+            metrics['live_overrun_samples'] = self.tracker.ring.overruns
+            metrics['live_skipped_seconds'] = self.tracker.skipped_seconds
+        return metrics
+
+
+def print_note(note):
+    print(f"{note['startTime']:7.2f}s  {note['name']:<4} {note['duration']:.2f}s")
+
 
-def record(output_filename):
-    recorder = AudioRecorder(output_filename, output_filename+"_reduced.wav")
+def record(output_filename, source=None, live=False, save=True):
+    recorder = AudioRecorder(output_filename, output_filename+"_reduced.wav", source=source, live=live,
+                             on_note=print_note)
 
     def start_recording_thread():
         try:
@@ -88,7 +141,7 @@ def record(output_filename):
 
     def stop_recording_thread():
         try:
-            recorder.stop_recording()
+            recorder.stop_recording(save=save)
         except Exception as e:
             print(f"Failed to stop recording thread: {e}")
 
@@ -103,9 +156,12 @@ def record(output_filename):
     recording_thread.join()
 
     print("Recording process has completed.")
+    return recorder
 
 
 if __name__ == "__main__":
     filename = f"../audio/{input('Enter name of audio file: ')}.wav"
-    record(filename)
-    analyze_and_plot_audio(filename)
+    recorder = record(filename, live='--live' in sys.argv)
+    # Analyze the take from memory rather than re-reading the file just written
+    rate, samples = recorder.recorded_audio()
+    analyze_and_plot_audio(samples, sr=rate)
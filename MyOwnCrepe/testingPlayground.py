@@ -1,42 +1,70 @@
 # USE THIS FILE FOR RAPID PROTOTYPING. THIS FILE IS MEANT TO SERVE AS A TESTING GROUND FOR A FUTURE IMPLEMENTATION OF model.py.
 import logging
+import os
+import sys
 import numpy as np
-from scipy import signal
-from scipy.io import wavfile
-import crepe
-import matplotlib.pyplot as plt
-from ruptures import Pelt
 from statistics import mode, StatisticsError
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.changepoint import PeltL2, WindowedPelt
+from app.config import AnalysisConfig
+from app.pitch import midi_note_names, midi_to_frequency, note_names
+from app.scheduler import crepe_predict
+from app.tracks import load_track
+
 logging.basicConfig(level=logging.WARNING)
 
 
 
 def note_to_freq(note):
-    return 440 * (2 ** ((note - 69) / 12))
+    return midi_to_frequency(note)
 
 
 def note_name(midi_note):
-    notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    return notes[int(midi_note) % 12] + str(int((midi_note - 12) / 12))
+    return midi_note_names([midi_note])[0]
 
 
 
 def adaptive_median_filter(data, max_window):
+    # Frame i takes the median of the 2 * (i % (max_window // 2)) + 1 frames centred on it (cut at the end
+    # of the track). Frames sharing a radius are filtered together, one batched np.median per radius.
+    if max_window < 2:
+        raise ValueError("max_window must be at least 2")
+    data = np.asarray(data)
     result = np.zeros_like(data)
-    for i in range(len(data)):
-        window = min(max_window, 2 * (i % (max_window // 2)) + 1)
-        start = max(0, i - window // 2)
-        end = min(len(data), i + window // 2 + 1)
-        result[i] = np.median(data[start:end])
+    period = max_window // 2
+    n = len(data)
+    for radius in range(min(period, n)):
+        centers = np.arange(radius, n, period)
+        full = centers[centers + radius < n]
+        if len(full):
+            windows = data[full[:, None] + np.arange(-radius, radius + 1)]
+            result[full] = np.median(windows, axis=1)
+        for i in centers[len(full):]:
+            result[i] = np.median(data[i - radius:])
     return result
 
 
 
 
-def robust_change_point_detection(data, penalty):
+CHANGE_POINT_METHODS = {
+    # ruptures over the whole track: the rbf kernel matrix grows with the square of its length
+    'rbf': lambda: _ruptures_pelt(model="rbf"),
+    # Same detector on overlapping 20 s windows; identical on shorter tracks, bounded memory on long ones
+    'windowed-rbf': lambda: WindowedPelt(model="rbf"),
+    # Least-squares cost from prefix sums, linear memory and much faster
+    'l2': lambda: PeltL2(),
+}
+
+
+def _ruptures_pelt(**kwargs):
+    from ruptures import Pelt
+    return Pelt(**kwargs)
+
+
+def robust_change_point_detection(data, penalty, method='rbf'):
     # Use a combination of methods for more robust detection
-    algo = Pelt(model="rbf").fit(data.reshape(-1, 1))
+    algo = CHANGE_POINT_METHODS[method]().fit(data.reshape(-1, 1))
     change_points_pelt = algo.predict(pen=penalty)
 
     # You might want to combine this with other methods like
@@ -75,12 +103,7 @@ def improved_quantize_to_musical_notes(frequency):
 
 
 def freq_to_note(freq):
-    A4 = 440
-    notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    note_number = 12 * (np.log2(freq / A4) + 4)
-    note_index = int(round(note_number)) % 12
-    octave = int(note_number // 12) - 1
-    return f"{notes[note_index]}{octave}"
+    return note_names([freq])[0]
 
 
 def improved_segmentation(time, freq, change_points, min_duration, min_samples=3):
@@ -101,20 +124,40 @@ def improved_segmentation(time, freq, change_points, min_duration, min_samples=3
     return segments
 
 
-def analyze_and_plot_audio(file_path, median_window=31, penalty=20, min_duration=0.1, merge_threshold=0.5):
-    # ... (keep the existing code for loading and initial processing)
-    # Load the file
-    sr, audio = wavfile.read(file_path)
+def load_audio(file_path, sr=None):
+    # Accept either a WAV path or samples that are already in memory (e.g. from AudioRecorder)
+    if isinstance(file_path, np.ndarray):
+        if sr is None:
+            raise ValueError("sr is required when passing samples instead of a file path")
+        return sr, file_path
+    from scipy.io import wavfile
+    return wavfile.read(file_path)
+
+
+def analyze_and_plot_audio(file_path, median_window=31, penalty=20, min_duration=0.1, merge_threshold=0.5, sr=None,
+                           config=None, track=None, change_point_method='rbf'):
+    config = config or AnalysisConfig(model_capacity='full', confidence_threshold=0.80)
+
+    if track is None:
+        # ... (keep the existing code for loading and initial processing)
+        # Load the file, or take the samples as given
+        sr, audio = load_audio(file_path, sr)
 
-    # Convert stereo to mono if necessary
-    if len(audio.shape) > 1:
-        audio = np.mean(audio, axis=1)
+        # Convert stereo to mono if necessary
+        if len(audio.shape) > 1:
+            audio = np.mean(audio, axis=1)
 
-    # Predict the pitch using CREPE
-    time, frequency, confidence, _ = crepe.predict(audio, sr, viterbi=True, model_capacity='full')
+        # Predict the pitch using CREPE
+        time, frequency, confidence, _ = crepe_predict(audio, sr, viterbi=config.viterbi,
+                                                       model_capacity=config.model_capacity,
+                                                       step_size=config.step_size)
+    else:
+        # Reuse a stored pitch track (dict or saved directory) so only the segmentation below is redone
+        track = load_track(track) if isinstance(track, str) else track
+        time, frequency, confidence = track['time'], track['frequency'], track['confidence']
 
     # Apply more sophisticated filtering
-    high_confidence = confidence > 0.80
+    high_confidence = confidence > config.confidence_threshold
     time = time[high_confidence]
     frequency = frequency[high_confidence]
 
@@ -122,7 +165,7 @@ def analyze_and_plot_audio(file_path, median_window=31, penalty=20, min_duration
     frequency_median = adaptive_median_filter(frequency, max_window=median_window)
 
     # Use more robust change point detection
-    change_points = robust_change_point_detection(frequency_median, penalty)
+    change_points = robust_change_point_detection(frequency_median, penalty, change_point_method)
 
     # Improved segmentation with overlapping windows
     segments = improved_segmentation(time, frequency_median, change_points, min_duration)
@@ -130,7 +173,8 @@ def analyze_and_plot_audio(file_path, median_window=31, penalty=20, min_duration
     # Create final segmented frequency array
     segmented_frequency = create_segmented_frequency(segments, len(frequency_median))
 
-    # Plot the results
+    # Plot the results (matplotlib is only imported when a plot is drawn)
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     plt.scatter(time, frequency, s=1, alpha=0.5, label='Original', color='blue')
     plt.scatter(time, segmented_frequency, s=2, label='Segmented', color='red')
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MEMORY_MAX_MB = float(os.environ.get('RESULT_CACHE_MB', 256))
+DISK_DIR = os.environ.get('RESULT_CACHE_DIR') or None
+DISK_MAX_MB = float(os.environ.get('RESULT_CACHE_DISK_MB', 2048))
+
+ARRAY_FIELDS = ('time', 'frequency', 'confidence', 'activation')
+
+
+def cache_key(audio, sr, **params):
+    """
+    Content address for an analysis: a hash of the decoded PCM plus every
+    parameter that changes the result (model capacity, threshold, viterbi...).
+    """
+    audio = np.ascontiguousarray(audio)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{sr}|{audio.dtype.str}|{audio.shape}|'.encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(audio.view(np.uint8).data)
+    return digest.hexdigest()
+
+
+def _entry_size(entry):
+    size = sum(entry[name].nbytes for name in ARRAY_FIELDS if entry.get(name) is not None)
+    return size + 200 * len(entry.get('notes', ()))
+
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results.
+
+    Entries hold the raw CREPE arrays and the derived note list. The memory
+    tier is an LRU bounded by total array size; the optional disk tier keeps
+    one .npz per entry and evicts the least recently used files once the
+    directory grows past `disk_max_bytes`.
+    """
+
+    def __init__(self, max_bytes=MEMORY_MAX_MB * 2 ** 20, disk_dir=DISK_DIR, disk_max_bytes=DISK_MAX_MB * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_memory(key, entry)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._store_memory(key, entry)
+        self._write_disk(key, entry)
+
+    def _store_memory(self, key, entry):
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= _entry_size(self._memory.pop(key))
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= _entry_size(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + '.npz')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in ARRAY_FIELDS if name in data.files}
+                entry['notes'] = json.loads(str(data['notes']))
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, KeyError, ValueError):
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        arrays = {name: entry[name] for name in ARRAY_FIELDS if entry.get(name) is not None}
+        tmp_path = self._path(key) + f'.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, notes=np.array(json.dumps(entry['notes'])), **arrays)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.npz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+
+result_cache = ResultCache()
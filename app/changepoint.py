@@ -0,0 +1,149 @@
+"""
+Change-point detection that scales to long pitch tracks.
+
+PeltL2 is a drop-in for ruptures' `Pelt(model="l2")`: the same PELT search,
+candidate grid (min_size, jump) and pruning rule, with segment costs read
+from prefix sums in O(1) instead of recomputing a variance per candidate.
+
+WindowedPelt runs a detector over overlapping windows and stitches the
+breakpoints, so the rbf kernel matrix is window² instead of track² and the
+cost grows linearly with the track.
+"""
+import numpy as np
+
+# Points used to estimate the rbf bandwidth of a long track
+GAMMA_SAMPLE = 2000
+
+
+def _as_2d(signal):
+    signal = np.asarray(signal, dtype=np.float64)
+    return signal.reshape(-1, 1) if signal.ndim == 1 else signal
+
+
+class PeltL2:
+    """
+    Penalized least-squares segmentation (PELT) with prefix-sum costs.
+
+    Same interface and results as `ruptures.Pelt(model="l2", min_size=..., jump=...)`,
+    up to float rounding in near-tied costs. Memory is O(n).
+    """
+
+    def __init__(self, min_size=2, jump=5):
+        self.min_size = min_size
+        self.jump = jump
+        self.n_samples = None
+
+    def fit(self, signal):
+        signal = _as_2d(signal)
+        # Centering keeps the prefix sums small, so sum_sq - sum²/n doesn't cancel badly
+        centered = signal - signal.mean(axis=0)
+        zeros = np.zeros((1, signal.shape[1]))
+        self._sum = np.concatenate((zeros, np.cumsum(centered, axis=0)))
+        self._sum_sq = np.concatenate((zeros, np.cumsum(centered ** 2, axis=0)))
+        self.n_samples = len(signal)
+        return self
+
+    def cost(self, starts, end):
+        """Sum of squared deviations from the mean of signal[start:end], for each start."""
+        length = (end - starts)[:, None]
+        total = self._sum[end] - self._sum[starts]
+        total_sq = self._sum_sq[end] - self._sum_sq[starts]
+        return np.sum(total_sq - total ** 2 / length, axis=1)
+
+    def predict(self, pen):
+        """Sorted breakpoints, ending with n_samples, like ruptures."""
+        n, jump, min_size = self.n_samples, self.jump, self.min_size
+        if n < min_size:
+            raise ValueError(f"Cannot segment {n} samples with min_size={min_size}")
+
+        # best[t]: cost of the optimal segmentation of signal[:t]; previous[t]: its last breakpoint before t
+        best = np.full(n + 1, np.nan)
+        best[0] = 0.0
+        previous = np.zeros(n + 1, dtype=np.int64)
+        admissible = np.zeros(0, dtype=np.int64)
+
+        ends = [k for k in range(0, n, jump) if k >= min_size] + [n]
+        for end in ends:
+            candidate = (end - min_size) // jump * jump
+            if not np.isnan(best[candidate]) and (len(admissible) == 0 or admissible[-1] != candidate):
+                admissible = np.append(admissible, candidate)
+
+            totals = best[admissible] + (self.cost(admissible, end) + pen)
+            i = np.argmin(totals)
+            best[end] = totals[i]
+            previous[end] = admissible[i]
+            # Starts that can't beat the optimum even with one breakpoint fewer are dropped for good
+            admissible = admissible[totals <= best[end] + pen]
+
+        bkps = [n]
+        while previous[bkps[-1]] > 0:
+            bkps.append(int(previous[bkps[-1]]))
+        return bkps[::-1]
+
+    def fit_predict(self, signal, pen):
+        return self.fit(signal).predict(pen)
+
+
+class WindowedPelt:
+    """
+    PELT on overlapping windows of `window` samples.
+
+    Each window contributes the breakpoints in its core, the part more than
+    overlap/2 from its edges, so a change is judged with context on both
+    sides. Tracks shorter than `window` are segmented in one piece, exactly
+    as the wrapped detector would. For rbf, the kernel bandwidth is estimated
+    once from a subsample of the whole track so every window uses the same
+    scale.
+
+    Args:
+        model: "l2" (PeltL2) or any ruptures cost model, e.g. "rbf"
+    """
+
+    def __init__(self, model="rbf", min_size=2, jump=5, params=None, window=2000, overlap=200):
+        if overlap >= window:
+            raise ValueError("overlap must be smaller than window")
+        self.model = model
+        self.min_size = min_size
+        self.jump = jump
+        self.params = dict(params or {})
+        self.window = window
+        self.overlap = overlap
+        self.signal = None
+
+    def fit(self, signal):
+        self.signal = _as_2d(signal)
+        if self.model == "rbf" and "gamma" not in self.params and len(self.signal) > self.window:
+            self.params["gamma"] = rbf_gamma(self.signal)
+        return self
+
+    def _detector(self):
+        if self.model == "l2":
+            return PeltL2(min_size=self.min_size, jump=self.jump)
+        from ruptures import Pelt
+        return Pelt(model=self.model, min_size=self.min_size, jump=self.jump, params=self.params or None)
+
+    def predict(self, pen):
+        n = len(self.signal)
+        step = self.window - self.overlap
+        bkps = []
+        for start in range(0, n, step):
+            end = min(start + self.window, n)
+            local = self._detector().fit(self.signal[start:end]).predict(pen)[:-1]
+            low = start + self.overlap // 2 if start > 0 else 0
+            high = end - self.overlap // 2 if end < n else n
+            bkps += [start + bkp for bkp in local if low <= start + bkp < high]
+            if end == n:
+                break
+        return bkps + [n]
+
+    def fit_predict(self, signal, pen):
+        return self.fit(signal).predict(pen)
+
+
+def rbf_gamma(signal, sample=GAMMA_SAMPLE):
+    """ruptures' median heuristic for the rbf bandwidth, on an evenly strided subsample."""
+    from scipy.spatial.distance import pdist
+    signal = _as_2d(signal)
+    distances = pdist(signal[::max(1, len(signal) // sample)], metric="sqeuclidean")
+    median = np.median(distances)
+    return 1 / median if median != 0 else 1.0
@@ -0,0 +1,103 @@
+import os
+from dataclasses import asdict, dataclass, replace
+
+from app.segmentation import CONFIDENCE_THRESHOLD, MAX_GAP, MAX_SLOPE, MIN_DURATION
+
+CAPACITIES = ('tiny', 'small', 'medium', 'large', 'full')
+DEFAULT_CAPACITY = os.environ.get('CREPE_MODEL_CAPACITY', 'large')
+
+
+@dataclass(frozen=True)
+class AnalysisConfig:
+    """
+    Everything that changes what CREPE and the note grouping produce.
+
+    Pitch tracking (changing these re-runs CREPE):
+    model_capacity: 'tiny', 'small', 'medium', 'large' or 'full'
+    step_size: Hop between pitch frames in milliseconds
+    viterbi: Smooth the pitch curve with Viterbi decoding
+    vad: Skip CREPE on silent stretches (see app.vad)
+
+    Note segmentation (cheap to change against a stored pitch track):
+    confidence_threshold: Frames at or below this confidence are ignored
+    max_gap: Longest gap in seconds between frames of the same note
+    max_slope: Fastest pitch change in Hz/s within a note
+    min_duration: Notes no longer than this many seconds are dropped
+    """
+    model_capacity: str = DEFAULT_CAPACITY
+    step_size: int = 10
+    viterbi: bool = True
+    confidence_threshold: float = CONFIDENCE_THRESHOLD
+    vad: bool = False
+    max_gap: float = MAX_GAP
+    max_slope: float = MAX_SLOPE
+    min_duration: float = MIN_DURATION
+
+    def __post_init__(self):
+        if self.model_capacity not in CAPACITIES:
+            raise ValueError(f"Unknown model capacity '{self.model_capacity}', expected one of {', '.join(CAPACITIES)}")
+        if not isinstance(self.step_size, int) or self.step_size <= 0:
+            raise ValueError(f"step_size must be a positive number of milliseconds, got {self.step_size}")
+        if not 0 <= self.confidence_threshold < 1:
+            raise ValueError(f"confidence_threshold must be in [0, 1), got {self.confidence_threshold}")
+        for name in ('max_gap', 'max_slope', 'min_duration'):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must not be negative, got {getattr(self, name)}")
+
+    @classmethod
+    def from_preset(cls, name, **overrides):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown preset '{name}', expected one of {', '.join(PRESETS)}")
+        return replace(PRESETS[name], **overrides)
+
+    @classmethod
+    def from_mapping(cls, values, default=None):
+        """
+        Build a config from string values such as Flask's request.values:
+        an optional `preset` plus per-field overrides.
+        """
+        base = cls.from_preset(values['preset']) if values.get('preset') else (default or cls())
+        overrides = {}
+        if values.get('model_capacity'):
+            overrides['model_capacity'] = values['model_capacity']
+        if values.get('step_size'):
+            overrides['step_size'] = _parse(int, 'step_size', values['step_size'])
+        if values.get('viterbi'):
+            overrides['viterbi'] = _parse_bool(values['viterbi'])
+        for name in ('confidence_threshold', 'max_gap', 'max_slope', 'min_duration'):
+            if values.get(name):
+                overrides[name] = _parse(float, name, values[name])
+        if values.get('vad'):
+            overrides['vad'] = _parse_bool(values['vad'])
+        return replace(base, **overrides)
+
+    def as_dict(self):
+        return asdict(self)
+
+    def pitch_params(self):
+        """The fields that determine the pitch track, i.e. the CREPE run."""
+        return {name: getattr(self, name) for name in ('model_capacity', 'step_size', 'viterbi', 'vad')}
+
+    def segmentation_params(self):
+        """Keyword arguments for app.segmentation.segment_notes / NoteSegmenter."""
+        return {'threshold': self.confidence_threshold, 'max_gap': self.max_gap, 'max_slope': self.max_slope,
+                'min_duration': self.min_duration}
+
+
+def _parse(kind, name, value):
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}'")
+
+
+def _parse_bool(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# See the preset table in README.md for the cost of each
+PRESETS = {
+    'realtime': AnalysisConfig(model_capacity='tiny', step_size=20, viterbi=False, vad=True),
+    'balanced': AnalysisConfig(model_capacity='medium', step_size=10, viterbi=True),
+    'archival': AnalysisConfig(model_capacity='full', step_size=10, viterbi=True),
+}
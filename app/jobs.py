@@ -0,0 +1,153 @@
+"""
+In-process job queue for analyses that would outlive an HTTP request.
+
+`POST /jobs` decodes the upload, enqueues the work and returns a job ID at
+once; a fixed pool of worker threads runs the jobs, so no more than
+`workers` analyses compete for the model at a time and inference from
+concurrent jobs is still batched by the registry's scheduler. When
+`max_pending` jobs are already waiting, `submit` raises QueueFull and the
+service answers 503 instead of piling up work it can't finish.
+
+Finished jobs are kept for `ttl` seconds so clients can fetch the result.
+Jobs live in the worker process's memory: with several gunicorn workers,
+poll through a sticky load balancer (or run the job endpoints on one worker).
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+
+from app import metrics
+
+JOB_WORKERS = int(os.environ.get('CREPE_JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.environ.get('CREPE_JOB_MAX_PENDING', 32))
+JOB_TTL_SECONDS = float(os.environ.get('CREPE_JOB_TTL_SECONDS', 3600))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when `max_pending` jobs are already waiting."""
+
+
+class Job:
+    __slots__ = ('id', 'kind', 'seq', 'status', 'result', 'error', 'created', 'started', 'finished', 'fn')
+
+    def __init__(self, kind, seq, fn):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.seq = seq
+        self.fn = fn
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._threads = []
+
+    def _start(self):
+        # Workers are started with the first job, so importing the app doesn't spawn threads
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f'crepe-job-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind, fn):
+        """Queue fn() to run on a worker; returns the Job. Raises QueueFull under backpressure."""
+        job = Job(kind, next(self._seq), fn)
+        with self._lock:
+            self._prune()
+            self._start()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f'{self.max_pending} jobs already waiting') from None
+            self._jobs[job.id] = job
+        self._report()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def position(self, job):
+        """Number of queued jobs ahead of `job` (None once it has started)."""
+        if job.status != QUEUED:
+            return None
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == QUEUED and other.seq < job.seq)
+
+    def depth(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'queued': statuses.count(QUEUED),
+            'running': statuses.count(RUNNING),
+            'workers': self.workers,
+            'maxPending': self.max_pending,
+        }
+
+    def describe(self, job):
+        """JSON-ready status of a job."""
+        now = time.time()
+        description = {
+            'jobId': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'waitSeconds': (job.started or now) - job.created,
+        }
+        if job.status == QUEUED:
+            description['position'] = self.position(job)
+        if job.started is not None:
+            description['runSeconds'] = (job.finished or now) - job.started
+        if job.status == FAILED:
+            description['error'] = job.error
+        return description
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+            job.started = time.time()
+            self._report()
+            try:
+                job.result = job.fn()
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            job.fn = None  # drop the decoded audio
+            job.finished = time.time()
+            self._report()
+            if metrics.ENABLED:
+                metrics.JOBS_FINISHED.inc(status=job.status)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job.id for job in self._jobs.values() if job.finished is not None and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _report(self):
+        if metrics.ENABLED:
+            depth = self.depth()
+            metrics.JOBS.set(depth['queued'], status=QUEUED)
+            metrics.JOBS.set(depth['running'], status=RUNNING)
+
+
+job_queue = JobQueue()
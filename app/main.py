@@ -1,20 +1,132 @@
 import io
 import os
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify
 from flask import send_file
 
-from app.model import analyze_audio_old, export_to_midi
+from app import metrics
+from app.cache import result_cache
+from app.config import AnalysisConfig
+from app.jobs import DONE, FAILED, QueueFull, job_queue
+from app.model import analyze_cached, compute_track, export_to_midi, load_wav, segment_track, track_id
+from app.registry import registry
+from app.streaming import RESPONSE_CHUNK_SECONDS, ndjson_lines, sse_events, stream_notes
+from app.tracks import track_store
+
+
+class InMemoryRequest(Request):
+    # Keep uploads in memory instead of letting werkzeug spool large ones to a temp file
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+
+# Build and warm up the models once per worker, off the request path. Capacities
+# that aren't preloaded are loaded (and warmed) by the first request asking for them.
+PRELOAD = os.environ.get('CREPE_PRELOAD', '1') == '1'
+PRELOAD_CAPACITIES = [capacity for capacity in
+                      os.environ.get('CREPE_PRELOAD_CAPACITIES', registry.default_capacity).split(',') if capacity]
+if PRELOAD:
+    for capacity in PRELOAD_CAPACITIES:
+        registry.load_async(capacity)
 
-# To test if server active
+# To test if server active. With preloading on, returns 503 until the models are
+# warm so the load balancer only routes traffic to workers that can serve them
+# immediately. A failed load is retried on the next check.
 @app.route('/', methods=['GET'])
 def home():
+    if PRELOAD:
+        for capacity in PRELOAD_CAPACITIES:
+            if registry.is_ready(capacity):
+                continue
+            status = registry.status(capacity)
+            if status['status'] in ('unloaded', 'failed'):
+                registry.load_async(capacity)
+            if status['status'] == 'failed':
+                return f"Model Failed: {status['error']}", 503
+            return "Model Loading", 503
     return "Server Active", 200
 
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_timing():
+        g.metrics_token = metrics.begin_request()
+        # werkzeug parses the upload lazily; do it here so it shows up as its own stage
+        if request.method == 'POST':
+            with metrics.stage('upload'):
+                request.files
+
+    @app.after_request
+    def finish_timing(response):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            server_timing = metrics.end_request(token, request.endpoint or 'unknown', response.status_code)
+            if server_timing:
+                response.headers['Server-Timing'] = server_timing
+        return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.ENABLED:
+        return 'Metrics disabled', 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def stored_track(audio, sr, config):
+    # Run CREPE only if this audio hasn't been tracked with these pitch parameters yet
+    key = track_id(audio, sr, config)
+    track = track_store.get(key)
+    if track is None:
+        track = compute_track(audio, sr, config, include_activation=request.values.get('activation') == '1')
+        track_store.put(key, track)
+    return key, track
+
+
+@app.route('/tracks', methods=['POST'])
+def create_track():
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'No file provided'}), 400
+
+    try:
+        config = AnalysisConfig.from_mapping(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        sr, audio = load_wav(request.files['file'].stream)
+        key, track = stored_track(audio, sr, config)
+        return jsonify({'trackId': key, **track['meta']}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/tracks/<track_id>', methods=['GET'])
+def get_track(track_id):
+    track = track_store.get(track_id)
+    if track is None:
+        return jsonify({'error': 'Unknown track'}), 404
+    return jsonify({'trackId': track_id, **track['meta']})
+
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
+    try:
+        config = AnalysisConfig.from_mapping(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Re-segment a stored pitch track; only the segmentation parameters apply
+    if request.values.get('track_id'):
+        track = track_store.get(request.values['track_id'])
+        if track is None:
+            return jsonify({'error': 'Unknown track'}), 404
+        response = jsonify(segment_track(track, config))
+        response.headers['X-Track-Id'] = request.values['track_id']
+        return response
+
     if 'file' not in request.files:
         return jsonify({'error': 'No file file provided'}), 400
 
@@ -23,15 +135,36 @@ def analyze():
         return jsonify({'error': 'No selected file'}), 400
 
     if audio_file and audio_file.filename.endswith('.wav'):
-        save_directory = './'
-        os.makedirs(save_directory, exist_ok=True)
-        file_path = os.path.join(save_directory, audio_file.filename)
-        audio_file.save(file_path)
-
         try:
-            result = analyze_audio_old(file_path)
+            # Decode straight from the upload stream, nothing touches the disk
+            sr, audio = load_wav(audio_file.stream)
+
+            # Keep the pitch track so later requests can re-segment it by ID
+            if request.values.get('save_track') == '1':
+                key, track = stored_track(audio, sr, config)
+                response = jsonify(segment_track(track, config))
+                response.headers['X-Track-Id'] = key
+                return response
+
+            # Long recordings: run CREPE chunk by chunk so memory follows the chunk size
+            chunk_seconds = request.values.get('chunk_seconds', type=float)
+
+            # Send each note as soon as it is closed instead of waiting for the whole clip
+            stream = request.values.get('stream')
+            if stream in ('ndjson', 'sse'):
+                notes = stream_notes((sr, audio), config, chunk_seconds=chunk_seconds or RESPONSE_CHUNK_SECONDS)
+                if stream == 'sse':
+                    return Response(sse_events(notes), mimetype='text/event-stream')
+                return Response(ndjson_lines(notes), mimetype='application/x-ndjson')
 
-            return jsonify(result)
+            if chunk_seconds:
+                return jsonify(list(stream_notes((sr, audio), config, chunk_seconds=chunk_seconds)))
+
+            result, hit = analyze_cached(audio, sr, result_cache, config)
+
+            response = jsonify(result)
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -42,51 +175,123 @@ def analyze():
 
 @app.route('/midi', methods=['POST'])
 def create_midi():
-    # Assuming your audio file was uploaded with the request
-    if 'file' not in request.files:
-        return 'No file uploaded', 400
-
-    file = request.files['file']
-    if file.filename == '':
-        return 'No file selected', 400
-
-    # Create a temporary path to save the uploaded wav file
-    temp_wav_path = "temp_audio.wav"
-    file.save(temp_wav_path)
-    # Create a temporary path for the MIDI file
-    temp_midi_path = "temp_output.mid"
     try:
-        # Analyze the audio using your existing function
-        notes = analyze_audio_old(temp_wav_path)
+        config = AnalysisConfig.from_mapping(request.values)
+    except ValueError as e:
+        return str(e), 400
+
+    if request.values.get('track_id'):
+        track = track_store.get(request.values['track_id'])
+        if track is None:
+            return 'Unknown track', 404
+    else:
+        # Assuming your audio file was uploaded with the request
+        if 'file' not in request.files:
+            return 'No file uploaded', 400
 
-        # Convert to MIDI using your existing function
-        export_to_midi(notes, temp_midi_path)
+        file = request.files['file']
+        if file.filename == '':
+            return 'No file selected', 400
+        track = None
 
-        # Read the MIDI file into memory
-        with open(temp_midi_path, 'rb') as midi_file:
-            midi_data = io.BytesIO(midi_file.read())
+    try:
+        if track is not None:
+            notes, hit = segment_track(track, config), True
+        else:
+            # Analyze the upload straight from memory
+            sr, audio = load_wav(file.stream)
+            notes, hit = analyze_cached(audio, sr, result_cache, config)
 
-        # Clean up temporary files
-        os.remove(temp_wav_path)
-        os.remove(temp_midi_path)
+        # Convert to MIDI in memory
+        midi_data = io.BytesIO(export_to_midi(notes, None))
 
         # Return the MIDI file
-        return send_file(
+        response = send_file(
             midi_data,
             mimetype='audio/midi',
             as_attachment=True,
             download_name='converted.mid'
         )
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
 
     except Exception as e:
-        # Clean up temporary files in case of error
-        if os.path.exists(temp_wav_path):
-            os.remove(temp_wav_path)
-        if os.path.exists(temp_midi_path):
-            os.remove(temp_midi_path)
         return str(e), 500
 
 
+def run_job(kind, audio, sr, config):
+    # Runs on a job worker; the result cache is shared with the blocking endpoints
+    notes, _ = analyze_cached(audio, sr, result_cache, config)
+    if kind == 'analyze':
+        return notes
+    return export_to_midi(notes, None)
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    kind = request.values.get('kind', 'analyze')
+    if kind not in ('analyze', 'midi'):
+        return jsonify({'error': "kind must be 'analyze' or 'midi'"}), 400
+
+    try:
+        config = AnalysisConfig.from_mapping(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'No file provided'}), 400
+
+    try:
+        sr, audio = load_wav(request.files['file'].stream)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job = job_queue.submit(kind, lambda: run_job(kind, audio, sr, config))
+    except QueueFull as e:
+        # Backpressure: tell the client to come back rather than queueing without bound
+        response = jsonify({'error': str(e), **job_queue.depth()})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    response = jsonify(job_queue.describe(job))
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response, 202
+
+
+@app.route('/jobs', methods=['GET'])
+def job_queue_depth():
+    return jsonify(job_queue.depth())
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    description = job_queue.describe(job)
+    if job.status == DONE:
+        if job.kind == 'analyze':
+            description['result'] = job.result
+        description['resultUrl'] = f'/jobs/{job.id}/result'
+    return jsonify(description)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status == FAILED:
+        return jsonify(job_queue.describe(job)), 500
+    if job.status != DONE:
+        return jsonify(job_queue.describe(job)), 409
+    if job.kind == 'analyze':
+        return jsonify(job.result)
+    return send_file(io.BytesIO(job.result), mimetype='audio/midi', as_attachment=True,
+                     download_name='converted.mid')
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=4000, debug=True)
 
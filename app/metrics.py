@@ -0,0 +1,185 @@
+"""
+Stage timings and request metrics in the Prometheus text format.
+
+`stage(name)` times a block of the pipeline (decode, inference,
+segmentation, midi, ...) into a histogram, and into the current request's
+Server-Timing entries when one is being collected. Metrics are per process:
+with several gunicorn workers, each one serves its own /metrics.
+
+Set CREPE_METRICS=0 to turn all of it off; `stage` then hands back a shared
+no-op context manager and the record_* functions return immediately.
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('CREPE_METRICS', '1') == '1'
+SERVER_TIMING = ENABLED and os.environ.get('CREPE_SERVER_TIMING', '0') == '1'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+FRAMES_PER_SECOND_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+# (name, seconds) pairs of the request being handled, or None outside a request
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{{_labels(key)}}} {value}' if key else f'{self.name} {value}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                total = 0
+                for bound, count in zip(self.buckets, series):
+                    total += count
+                    le = '+Inf' if bound == math.inf else repr(float(bound))
+                    lines.append(f'{self.name}_bucket{{{_labels(key + (("le", le),))}}} {total}')
+                suffix = f'{{{_labels(key)}}}' if key else ''
+                lines.append(f'{self.name}_sum{suffix} {series[-1]}')
+                lines.append(f'{self.name}_count{suffix} {total}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('crepe_stage_seconds', 'Time spent in each pipeline stage.')
+REQUESTS = Counter('crepe_requests_total', 'HTTP requests by endpoint and status code.')
+REQUEST_SECONDS = Histogram('crepe_request_seconds', 'HTTP request latency by endpoint.')
+AUDIO_SECONDS = Counter('crepe_audio_seconds_total', 'Seconds of audio run through CREPE.')
+FRAMES = Counter('crepe_frames_total', 'Pitch frames produced by CREPE.')
+FRAMES_PER_SECOND = Histogram('crepe_frames_per_second', 'CREPE throughput per call, in frames per second.',
+                              FRAMES_PER_SECOND_BUCKETS)
+CACHE_LOOKUPS = Counter('crepe_cache_lookups_total', 'Result cache lookups by outcome (hit or miss).')
+JOBS = Gauge('crepe_jobs', 'Background jobs waiting or running, by status.')
+JOBS_FINISHED = Counter('crepe_jobs_finished_total', 'Background jobs finished, by status (done or failed).')
+
+ALL_METRICS = (REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, AUDIO_SECONDS, FRAMES, FRAMES_PER_SECOND, CACHE_LOOKUPS,
+               JOBS, JOBS_FINISHED)
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(seconds, stage=self.name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.name, seconds))
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """Context manager timing one pipeline stage."""
+    return _Stage(name) if ENABLED else _NO_STAGE
+
+
+def record_inference(audio_seconds, frames, seconds):
+    if not ENABLED:
+        return
+    AUDIO_SECONDS.inc(audio_seconds)
+    FRAMES.inc(frames)
+    if seconds > 0:
+        FRAMES_PER_SECOND.observe(frames / seconds)
+
+
+def record_cache(hit):
+    if ENABLED:
+        CACHE_LOOKUPS.inc(result='hit' if hit else 'miss')
+
+
+def begin_request():
+    """Start collecting the current request's stage timings; returns a token for end_request."""
+    return time.perf_counter(), _request_timings.set([] if SERVER_TIMING else None)
+
+
+def end_request(token, endpoint, status):
+    """Record the request and return its Server-Timing header value (None when disabled)."""
+    started, reset = token
+    seconds = time.perf_counter() - started
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    timings = _request_timings.get()
+    _request_timings.reset(reset)
+    if timings is None:
+        return None
+    entries = [f'{name};dur={duration * 1000:.1f}' for name, duration in timings]
+    return ', '.join(entries + [f'total;dur={seconds * 1000:.1f}'])
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    return '\n'.join(line for metric in ALL_METRICS for line in metric.render()) + '\n'
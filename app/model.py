@@ -1,24 +1,26 @@
 import os
-from midiutil import MIDIFile
-import matplotlib.pyplot as plt
-import crepe
-from scipy.io import wavfile
-import math
+import time as timer
 import numpy as np
 import warnings
 
+from app.cache import cache_key
+from app import metrics
+from app.config import AnalysisConfig
+from app.midi import encode_tracks
+from app.notes import NoteTrack
+from app.pitch import note_names
+from app.registry import registry
+from app.segmentation import CONFIDENCE_THRESHOLD, MAX_GAP, MAX_SLOPE, MIN_DURATION, segment_notes
+from app.vad import predict_voiced
+
 
 def frequency_to_note(freq):
-    A4 = 440.0
-    C0 = A4 * pow(2, -4.75)
-    note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    h = round(12 * np.log2(freq / C0))
-    octave = h // 12
-    n = h % 12
-    return note_names[n] + str(octave)
+    return note_names([freq])[0]
 
 
 def plot_detected_notes(weighted_averages):
+    import matplotlib.pyplot as plt
+
     # Extract note names, start times, and durations
     note_names = [note["name"] for note in weighted_averages]
     start_times = [note["startTime"] for note in weighted_averages]
@@ -39,72 +41,114 @@ def plot_detected_notes(weighted_averages):
     plt.show()
 
 
-def analyze_audio_old(file_path):
+def load_wav(source):
+    """
+    Decode a WAV file into a NumPy array.
+
+    Args:
+        source: Path to a WAV file, or a seekable file-like object such as an
+            upload stream held in memory
+
+    Returns:
+        Tuple of (sample rate, samples)
+    """
+    from scipy.io import wavfile
+    with metrics.stage('decode'):
+        return wavfile.read(source)
+
+
+def analyze_audio_old(file_path, config=None):
     # Load the file file
-    sr, file = wavfile.read(file_path)
-
-    # Predict the pitch
-    time, frequency, confidence, activation = crepe.predict(file, sr, viterbi=True, model_capacity='large')
-
-    # Create an array of tuples and filter by confidence
-    data = [(t, f, c) for t, f, c in zip(time, frequency, confidence) if c > 0.82]
-
-    # Extract the filtered values
-    filtered_time = [d[0] for d in data]
-    filtered_frequency = [d[1] for d in data]
-    filtered_confidence = [d[2] for d in data]
-
-    # Group frequencies into notes
-    notes = []
-    current_note = []
-    prev_f = None
-    prev_t = None
-    note_diff = None
-
-    for i in range(len(filtered_time)):
-        if i != 0:
-            note_diff = abs((filtered_frequency[i] - prev_f) / (filtered_time[i] - prev_t))
-        if not current_note:
-            current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
-        else:
-            time_diff = filtered_time[i] - current_note[-1][0]
-            if time_diff <= 0.1 and note_diff is not None and note_diff < 180:
-                current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
-            else:
-                notes.append(current_note)
-                current_note = [(filtered_time[i], filtered_frequency[i], filtered_confidence[i])]
-        prev_t = filtered_time[i]
-        prev_f = filtered_frequency[i]
-
-    if current_note:
-        notes.append(current_note)
-
-    long_notes = []
-    for note_array in notes:
-        time_last, freq_last, conf_last = note_array[-1]
-        time_first, freq_first, conf_first = note_array[0]
-        if (time_last - time_first) > 0.05:
-            long_notes.append(note_array)
-
-    notes = long_notes
-
-    # Calculate weighted average of frequencies for each note and match with initial and ending time
-    weighted_averages = []
-    for note in notes:
-        times, freqs, confs = zip(*note)
-        weighted_avg_freq = np.average(freqs, weights=confs)
-        start_time = times[0]
-        end_time = times[-1]
-        duration = end_time - start_time
-        musical_note = frequency_to_note(weighted_avg_freq)
-        weighted_averages.append({
-            "name": musical_note,
-            "duration": duration,
-            "frequency": weighted_avg_freq,
-            "startTime": start_time
-        })
-
-    return weighted_averages
+    sr, file = load_wav(file_path)
+    return analyze_samples(file, sr, config=config)
+
+
+def predict_pitch(file, sr, config):
+    # Skip silent stretches if asked to; their frames come back with zero confidence
+    started = timer.perf_counter()
+    with metrics.stage('inference'):
+        result = predict_voiced(file, sr, config, run_crepe)
+    metrics.record_inference(len(file) / sr, len(result[0]), timer.perf_counter() - started)
+    return result
+
+
+def run_crepe(file, sr, config):
+    # Predict the pitch on the shared, already warmed-up model
+    return registry.predict(file, sr, model_capacity=config.model_capacity, viterbi=config.viterbi,
+                            step_size=config.step_size)
+
+
+def analyze_samples(file, sr, config=None):
+    config = config or AnalysisConfig()
+    time, frequency, confidence, activation = predict_pitch(file, sr, config)
+    return group_notes(time, frequency, confidence, **config.segmentation_params())
+
+
+def analyze_cached(file, sr, cache, config=None):
+    """
+    Analyze decoded samples, serving repeated uploads from a ResultCache.
+
+    Returns:
+        Tuple of (notes, hit) where hit tells whether the model was skipped
+    """
+    config = config or AnalysisConfig()
+    key = cache_key(file, sr, **config.as_dict())
+    entry = cache.get(key)
+    metrics.record_cache(entry is not None)
+    if entry is not None:
+        return entry['notes'], True
+
+    time, frequency, confidence, activation = predict_pitch(file, sr, config)
+    notes = group_notes(time, frequency, confidence, **config.segmentation_params())
+    cache.put(key, {
+        'time': time,
+        'frequency': frequency,
+        'confidence': confidence,
+        'activation': activation,
+        'notes': notes,
+    })
+    return notes, False
+
+
+def track_id(file, sr, config):
+    # Only the pitch parameters matter: tracks are shared across segmentation settings
+    return cache_key(file, sr, **config.pitch_params())
+
+
+def compute_track(file, sr, config, include_activation=False):
+    """
+    Stage one: run CREPE and package the result as a pitch track (see app.tracks).
+    The (T, 360) activation matrix is large, so it is only kept when asked for.
+    """
+    time, frequency, confidence, activation = predict_pitch(file, sr, config)
+    return {
+        'time': time,
+        'frequency': frequency,
+        'confidence': confidence,
+        'activation': activation if include_activation else None,
+        'meta': {'sampleRate': int(sr), 'duration': len(file) / sr, 'frames': len(time), **config.pitch_params()},
+    }
+
+
+def segment_track(track, config=None):
+    """Stage two: notes from a stored pitch track, without running the model."""
+    config = config or AnalysisConfig()
+    return group_notes(track['time'], track['frequency'], track['confidence'], **config.segmentation_params())
+
+
+def group_notes(time, frequency, confidence, threshold=CONFIDENCE_THRESHOLD, max_gap=MAX_GAP, max_slope=MAX_SLOPE,
+                min_duration=MIN_DURATION):
+    # Filter by confidence, group frequencies into notes and drop the short ones
+    with metrics.stage('segmentation'):
+        start_times, end_times, frequencies = segment_notes(time, frequency, confidence, threshold=threshold,
+                                                            max_gap=max_gap, max_slope=max_slope,
+                                                            min_duration=min_duration)
+        return notes_to_dicts(start_times, end_times, frequencies)
+
+
+def notes_to_dicts(start_times, end_times, frequencies):
+    # Match the weighted average frequency of each note with its initial and ending time
+    return NoteTrack(start_times, end_times, frequency=frequencies).to_dicts()
 
 
 def export_to_midi(notes, output_file="output.mid", tempo=120):
@@ -112,42 +156,34 @@ def export_to_midi(notes, output_file="output.mid", tempo=120):
     Convert the analyzed notes to MIDI format
 
     Args:
-        notes: List of dictionaries containing note information (from analyze_audio)
-        output_file: Path to save the MIDI file
+        notes: A NoteTrack, or a list of note dicts as returned by analyze_audio
+        output_file: Path to save the MIDI file, a writable binary buffer
+            (e.g. io.BytesIO), or None to get the file back as bytes
         tempo: Tempo in BPM (default 120)
     """
-    # Create MIDI file with 1 track
-    midi = MIDIFile(1)
-    track = 0
-    time = 0
-    channel = 0
-    volume = 100  # 0-127
-
-    # Set tempo
-    midi.addTempo(track, time, tempo)
-
-    # Helper function to convert frequency to MIDI note number
-    def freq_to_midi_note(freq):
-        # A4 = 69, 440Hz
-        if freq <= 0: return 0
-        return int(round(69 + 12 * math.log2(freq / 440.0)))
-
-    # Add notes to the MIDI file
-    for note in notes:
-        freq = note["frequency"]
-        start_time = note["startTime"]
-        duration = note["duration"]
-
-        # Convert frequency to MIDI note number
-        midi_note = freq_to_midi_note(freq)
-
-        # Convert time to beats (assuming 120 BPM)
-        midi_time = start_time * (tempo / 60.0)
-        midi_duration = duration * (tempo / 60.0)
-
-        # Add note to MIDI file
-        midi.addNote(track, channel, midi_note, midi_time, midi_duration, volume)
-
-    # Save the MIDI file
+    with metrics.stage('midi'):
+        return _save_midi(encode_tracks([notes], tempo), output_file)
+
+
+def export_session_to_midi(tracks, output_file="session.mid", tempo=120, names=None):
+    """
+    Write several transcriptions (e.g. every clip of a batch) as one multi-track MIDI file
+
+    Args:
+        tracks: One NoteTrack or list of note dicts per clip
+        output_file: Path, writable binary buffer, or None to get the file back as bytes
+        tempo: Tempo in BPM (default 120)
+        names: Optional track names, one per clip
+    """
+    with metrics.stage('midi'):
+        return _save_midi(encode_tracks(tracks, tempo, names), output_file)
+
+
+def _save_midi(data, output_file):
+    if output_file is None:
+        return data
+    if hasattr(output_file, "write"):
+        output_file.write(data)
+        return None
     with open(output_file, "wb") as f:
-        midi.writeFile(f)
+        f.write(data)
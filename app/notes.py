@@ -0,0 +1,122 @@
+"""
+NoteTrack: a list of notes stored as parallel NumPy arrays.
+
+Every pipeline produces the same thing, a start, an end and a pitch per
+note, but used to pass it around as per-note dicts with module-specific
+keys. A NoteTrack holds those columns once (start, end, midi, frequency,
+confidence); `track[i]` gives a Note, a two-slot view that reads from the
+columns, so long transcriptions don't allocate a dict per note until they
+are serialized. `to_dicts` produces the service's JSON shape, `segments`
+the polyline matplotlib needs, and app.model.export_to_midi accepts a track
+directly.
+"""
+import numpy as np
+
+from app.pitch import frequency_to_midi, midi_to_frequency, note_names
+
+
+class Note:
+    """Read-only view of one note of a NoteTrack."""
+
+    __slots__ = ('_track', '_index')
+
+    def __init__(self, track, index):
+        self._track = track
+        self._index = index
+
+    start = property(lambda self: float(self._track.start[self._index]))
+    end = property(lambda self: float(self._track.end[self._index]))
+    midi = property(lambda self: float(self._track.midi[self._index]))
+    frequency = property(lambda self: float(self._track.frequency[self._index]))
+    confidence = property(lambda self: float(self._track.confidence[self._index]))
+    duration = property(lambda self: self.end - self.start)
+    name = property(lambda self: note_names([self._track.frequency[self._index]])[0])
+
+    def as_dict(self):
+        """The note as the service returns it."""
+        return {"name": self.name, "duration": self.duration, "frequency": self.frequency, "startTime": self.start}
+
+    def __repr__(self):
+        return f'Note({self.name}, start={self.start:.3f}, end={self.end:.3f})'
+
+
+class NoteTrack:
+    """
+    Notes as parallel arrays: start and end times (s), pitch as both MIDI
+    number and frequency (Hz), and mean confidence (NaN when the producer
+    doesn't track it). Give either `frequency` or `midi`; the other is derived.
+    """
+
+    __slots__ = ('start', 'end', 'midi', 'frequency', 'confidence')
+
+    def __init__(self, start, end, frequency=None, midi=None, confidence=None):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        if frequency is None and midi is None:
+            raise ValueError('NoteTrack needs frequency or midi')
+        self.frequency = np.asarray(frequency, dtype=np.float64) if frequency is not None else midi_to_frequency(midi)
+        self.midi = np.asarray(midi, dtype=np.float64) if midi is not None else frequency_to_midi(self.frequency)
+        self.confidence = (np.asarray(confidence, dtype=np.float64) if confidence is not None
+                           else np.full(len(self.start), np.nan))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0), np.zeros(0), frequency=np.zeros(0))
+
+    @classmethod
+    def from_dicts(cls, notes):
+        """Track from the service's note dicts (name, duration, frequency, startTime)."""
+        start = np.array([note["startTime"] for note in notes], dtype=np.float64)
+        duration = np.array([note["duration"] for note in notes], dtype=np.float64)
+        frequency = np.array([note["frequency"] for note in notes], dtype=np.float64)
+        return cls(start, start + duration, frequency=frequency)
+
+    @classmethod
+    def concatenate(cls, tracks):
+        tracks = list(tracks)
+        if not tracks:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(track, name) for track in tracks])
+                     for name in ('start', 'end', 'frequency', 'midi', 'confidence')))
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def __len__(self):
+        return len(self.start)
+
+    def __iter__(self):
+        return (Note(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Note(self, range(len(self))[index])
+        # Slices and masks select a sub-track (slices share memory with this one)
+        return NoteTrack(self.start[index], self.end[index], self.frequency[index], self.midi[index],
+                         self.confidence[index])
+
+    def __repr__(self):
+        return f'NoteTrack({len(self)} notes)'
+
+    def names(self):
+        return note_names(self.frequency)
+
+    def columns(self):
+        """The arrays themselves, keyed by column name (no copies)."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_dicts(self):
+        """The notes as the service returns them: [{name, duration, frequency, startTime}, ...]."""
+        if len(self) == 0:
+            return []
+        return [{"name": name, "duration": duration, "frequency": frequency, "startTime": start}
+                for name, duration, frequency, start in zip(self.names(), self.duration.tolist(),
+                                                            self.frequency.tolist(), self.start.tolist())]
+
+    def segments(self):
+        """(x, y) for one matplotlib line drawing every note at its MIDI pitch, broken by NaNs between notes."""
+        gaps = np.full(len(self), np.nan)
+        x = np.column_stack((self.start, self.end, gaps)).ravel()
+        y = np.column_stack((self.midi, self.midi, gaps)).ravel()
+        return x, y
@@ -0,0 +1,81 @@
+"""
+Pitch math on whole arrays: Hz, fractional MIDI note numbers, cents and
+note names.
+
+Every module used to carry its own scalar helper (and its own idea of where
+octaves start); these functions take arrays and convert them in one NumPy
+pass. Names follow scientific pitch notation, A4 = 440 Hz = MIDI 69, the
+convention the service has always returned:
+
+>>> note_names([440.0, 261.63, 27.5])
+['A4', 'C4', 'A0']
+>>> frequency_to_midi([220.0, 440.0, 466.16]).round(2).tolist()
+[57.0, 69.0, 70.0]
+>>> midi_numbers([0.0, 440.0, 445.0]).tolist()
+[0, 69, 69]
+>>> frequency_to_cents([10.0, 20.0]).tolist()
+[0.0, 1200.0]
+"""
+import numpy as np
+
+A4 = 440.0
+C0 = A4 * pow(2, -4.75)
+NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+# CREPE's cents scale is relative to 10 Hz
+CENTS_REFERENCE = 10.0
+
+# Note names by semitones above C0, from C-1 (8.2 Hz) to B10 (31.6 kHz)
+_LOWEST = -12
+_NAME_TABLE = np.array([NOTE_NAMES[h % 12] + str(h // 12) for h in range(_LOWEST, 132)])
+
+
+def frequency_to_midi(frequency):
+    """Fractional MIDI note numbers of frequencies in Hz (-inf for 0 Hz)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 69 + 12 * np.log2(np.asarray(frequency, dtype=np.float64) / A4)
+
+
+def midi_to_frequency(midi):
+    return A4 * 2 ** ((np.asarray(midi, dtype=np.float64) - 69) / 12)
+
+
+def midi_numbers(frequency):
+    """Nearest whole MIDI note numbers, as written to MIDI files; 0 for silent (non-positive) frequencies."""
+    frequency = np.asarray(frequency, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(frequency > 0, np.round(frequency_to_midi(frequency)), 0).astype(np.int64)
+
+
+def frequency_to_cents(frequency, reference=CENTS_REFERENCE):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1200 * np.log2(np.asarray(frequency, dtype=np.float64) / reference)
+
+
+def cents_to_frequency(cents, reference=CENTS_REFERENCE):
+    return reference * 2 ** (np.asarray(cents, dtype=np.float64) / 1200)
+
+
+def _names(semitones):
+    # semitones: whole semitones above C0
+    index = semitones.astype(np.int64) - _LOWEST
+    if np.all((index >= 0) & (index < len(_NAME_TABLE))):
+        return _NAME_TABLE[index].tolist()
+    return [NOTE_NAMES[h % 12] + str(h // 12) for h in semitones.astype(np.int64).tolist()]
+
+
+def note_names(frequency):
+    """Name and octave of the nearest note to each frequency, e.g. 'A4'. Raises ValueError on 0 Hz or NaN."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        semitones = np.round(12 * np.log2(np.asarray(frequency, dtype=np.float64).ravel() / C0))
+    if not np.all(np.isfinite(semitones)):
+        raise ValueError('note names need positive, finite frequencies')
+    return _names(semitones)
+
+
+def midi_note_names(midi):
+    """Names of the nearest whole MIDI note numbers, e.g. 69 -> 'A4'."""
+    semitones = np.round(np.asarray(midi, dtype=np.float64).ravel()) - 12
+    if not np.all(np.isfinite(semitones)):
+        raise ValueError('note names need finite MIDI numbers')
+    return _names(semitones)
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.config import CAPACITIES, DEFAULT_CAPACITY
+from app.scheduler import InferenceScheduler, activation_to_pitch, crepe_predict
+
+BATCHING = os.environ.get('CREPE_BATCHING', '1') == '1'
+
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ModelRegistry:
+    """
+    Process-wide store of warmed-up CREPE models, one per capacity.
+
+    crepe keeps built models in a module-level dict, so once a capacity has
+    been loaded here every later crepe call in this process reuses it.
+    """
+
+    def __init__(self, default_capacity=DEFAULT_CAPACITY, batching=BATCHING):
+        if default_capacity not in CAPACITIES:
+            raise ValueError(f"Unknown model capacity '{default_capacity}'")
+        self.default_capacity = default_capacity
+        self.batching = batching
+        self._lock = threading.Lock()
+        self._models = {}
+        self._schedulers = {}
+        self._status = {}
+        self._errors = {}
+        self._load_seconds = {}
+
+    def load(self, model_capacity=None):
+        """
+        Build the model, load its weights and run a dummy inference so the
+        TensorFlow graph is traced (and the Viterbi decoder compiled) before
+        the first real request. crepe, and with it TensorFlow, is imported
+        here rather than at module level, so importing the app stays fast.
+        """
+        model_capacity = model_capacity or self.default_capacity
+        if model_capacity not in CAPACITIES:
+            raise ValueError(f"Unknown model capacity '{model_capacity}'")
+
+        with self._lock:
+            if model_capacity in self._models:
+                return self._models[model_capacity]
+
+            self._status[model_capacity] = LOADING
+            started = time.perf_counter()
+            try:
+                from crepe.core import build_and_load_model
+                import scipy.io.wavfile  # noqa: F401  (warm load_wav's decoder now rather than on the first upload)
+                model = build_and_load_model(model_capacity)
+                activation_to_pitch(model.predict(np.zeros((2, 1024), dtype=np.float32), verbose=0))
+            except Exception as e:
+                self._status[model_capacity] = FAILED
+                self._errors[model_capacity] = str(e)
+                raise
+
+            self._models[model_capacity] = model
+            self._status[model_capacity] = READY
+            self._errors.pop(model_capacity, None)
+            self._load_seconds[model_capacity] = time.perf_counter() - started
+            return model
+
+    def load_async(self, model_capacity=None):
+        """Load a model on a background thread; poll `status` for progress."""
+        model_capacity = model_capacity or self.default_capacity
+        if not self.is_ready(model_capacity):
+            # Also marks a failed capacity as loading again, so a retry isn't started twice
+            self._status[model_capacity] = LOADING
+
+        def target():
+            try:
+                self.load(model_capacity)
+            except Exception:
+                pass  # recorded in self._errors, surfaced by status()
+
+        thread = threading.Thread(target=target, name=f'crepe-load-{model_capacity}', daemon=True)
+        thread.start()
+        return thread
+
+    def get(self, model_capacity=None):
+        model_capacity = model_capacity or self.default_capacity
+        model = self._models.get(model_capacity)
+        if model is None:
+            model = self.load(model_capacity)
+        return model
+
+    def scheduler(self, model_capacity=None):
+        """The micro-batching scheduler that owns inference for this capacity."""
+        model_capacity = model_capacity or self.default_capacity
+        model = self.get(model_capacity)
+        with self._lock:
+            if model_capacity not in self._schedulers:
+                self._schedulers[model_capacity] = InferenceScheduler(model)
+            return self._schedulers[model_capacity]
+
+    def is_ready(self, model_capacity=None):
+        return self._status.get(model_capacity or self.default_capacity) == READY
+
+    def status(self, model_capacity=None):
+        model_capacity = model_capacity or self.default_capacity
+        return {
+            'capacity': model_capacity,
+            'status': self._status.get(model_capacity, 'unloaded'),
+            'error': self._errors.get(model_capacity),
+            'loadSeconds': self._load_seconds.get(model_capacity),
+        }
+
+    def predict(self, audio, sr, model_capacity=None, viterbi=True, step_size=10):
+        """Same contract as crepe.predict, but always on a warm model and without progress bars."""
+        model_capacity = model_capacity or self.default_capacity
+        if self.batching:
+            return self.scheduler(model_capacity).predict(audio, sr, viterbi=viterbi, step_size=step_size)
+        self.get(model_capacity)
+        return crepe_predict(audio, sr, model_capacity=model_capacity, viterbi=viterbi, step_size=step_size)
+
+
+registry = ModelRegistry()
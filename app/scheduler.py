@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from app.viterbi import cents_to_frequency, local_average_cents, viterbi_cents
+
+MAX_BATCH_FRAMES = int(os.environ.get('CREPE_MAX_BATCH_FRAMES', 4096))
+MAX_WAIT_MS = float(os.environ.get('CREPE_BATCH_WAIT_MS', 10))
+PREDICT_BATCH_SIZE = int(os.environ.get('CREPE_PREDICT_BATCH_SIZE', 256))
+
+# crepe.core.model_srate, copied so that importing this module doesn't load TensorFlow
+MODEL_SRATE = 16000
+
+
+def frame_audio(audio, sr, step_size=10, center=True):
+    """
+    Cut audio into the normalized 1024-sample frames CREPE expects.
+
+    Mirrors the preprocessing in crepe.core.get_activation so that frames
+    from several requests can be stacked and sent to the model in one call.
+    """
+    if len(audio.shape) == 2:
+        audio = audio.mean(1)  # make mono
+    audio = audio.astype(np.float32)
+    if sr != MODEL_SRATE:
+        from resampy import resample
+        audio = resample(audio, sr, MODEL_SRATE)
+
+    if center:
+        audio = np.pad(audio, 512, mode='constant', constant_values=0)
+
+    hop_length = int(MODEL_SRATE * step_size / 1000)
+    n_frames = 1 + int((len(audio) - 1024) / hop_length)
+    frames = as_strided(audio, shape=(1024, n_frames),
+                        strides=(audio.itemsize, hop_length * audio.itemsize))
+    frames = frames.transpose().copy()
+
+    frames -= np.mean(frames, axis=1)[:, np.newaxis]
+    frames /= np.clip(np.std(frames, axis=1)[:, np.newaxis], 1e-8, None)
+    return frames
+
+
+def activation_to_pitch(activation, viterbi=True, step_size=10):
+    """Turn a (T, 360) activation matrix into crepe.predict's 4-tuple."""
+    confidence = activation.max(axis=1)
+
+    if viterbi:
+        cents = viterbi_cents(activation)
+    else:
+        cents = local_average_cents(activation)
+    frequency = cents_to_frequency(cents)
+
+    time = np.arange(confidence.shape[0]) * step_size / 1000.0
+
+    return time, frequency, confidence, activation
+
+
+def crepe_predict(audio, sr, model_capacity='full', viterbi=False, step_size=10):
+    """crepe.predict with the banded Viterbi decoder from app.viterbi instead of hmmlearn."""
+    from crepe.core import get_activation
+    activation = get_activation(audio, sr, model_capacity=model_capacity, step_size=step_size, verbose=0)
+    return activation_to_pitch(activation, viterbi=viterbi, step_size=step_size)
+
+
+class InferenceScheduler:
+    """
+    Collects frames from concurrent requests and runs them through the model
+    as one batch.
+
+    The worker thread waits for the first submission, then keeps gathering
+    until either `max_batch_frames` are queued or `max_wait` seconds have
+    passed since that first submission. Each caller gets back a Future that
+    resolves to the rows of the activation matrix belonging to its frames.
+    """
+
+    def __init__(self, model, max_batch_frames=MAX_BATCH_FRAMES, max_wait=MAX_WAIT_MS / 1000.0,
+                 predict_batch_size=PREDICT_BATCH_SIZE):
+        self.model = model
+        self.max_batch_frames = max_batch_frames
+        self.max_wait = max_wait
+        self.predict_batch_size = predict_batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='crepe-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, frames):
+        future = Future()
+        if len(frames) == 0:
+            future.set_result(np.zeros((0, 360), dtype=np.float32))
+            return future
+        self._queue.put((frames, future))
+        return future
+
+    def activation(self, frames):
+        return self.submit(frames).result()
+
+    def predict(self, audio, sr, viterbi=True, step_size=10):
+        """Same contract as crepe.predict, with inference shared across requests."""
+        frames = frame_audio(audio, sr, step_size=step_size)
+        activation = self.activation(frames)
+        return activation_to_pitch(activation, viterbi=viterbi, step_size=step_size)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        n_frames = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n_frames < self.max_batch_frames:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_frames += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(frames, future) for frames, future in self._collect()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                activation = self.model.predict(np.concatenate([frames for frames, _ in batch]),
+                                                batch_size=self.predict_batch_size, verbose=0)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for frames, future in batch:
+                # A copy, so a cached result doesn't keep the whole batch's activation alive
+                part = activation[start:start + len(frames)]
+                future.set_result(part.copy() if len(batch) > 1 else part)
+                start += len(frames)
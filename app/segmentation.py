@@ -0,0 +1,121 @@
+import numpy as np
+
+CONFIDENCE_THRESHOLD = 0.82
+MAX_GAP = 0.1
+MAX_SLOPE = 180
+MIN_DURATION = 0.05
+
+
+def split_points(time, frequency, max_gap=MAX_GAP, max_slope=MAX_SLOPE):
+    """
+    Boolean mask over consecutive frame pairs; True where frame i+1 starts a new note.
+
+    A frame continues the current note when it follows the previous frame by at
+    most `max_gap` seconds and the pitch moved slower than `max_slope` Hz/s.
+    """
+    dt = np.diff(time)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.abs(np.diff(frequency) / dt)
+    return ~((dt <= max_gap) & (slope < max_slope))
+
+
+def segment_notes(time, frequency, confidence, threshold=CONFIDENCE_THRESHOLD, max_gap=MAX_GAP,
+                  max_slope=MAX_SLOPE, min_duration=MIN_DURATION):
+    """
+    Group a CREPE pitch track into notes without a per-frame Python loop.
+
+    Frames at or below `threshold` confidence are dropped, the rest are split
+    wherever `split_points` says so, and notes no longer than `min_duration`
+    are discarded. Each note's frequency is the confidence-weighted average of
+    its frames.
+
+    Returns:
+        Tuple of (start_times, end_times, frequencies) arrays, one entry per note
+    """
+    segmenter = NoteSegmenter(threshold=threshold, max_gap=max_gap, max_slope=max_slope, min_duration=min_duration)
+    closed = segmenter.feed(time, frequency, confidence)
+    last = segmenter.finish()
+    return tuple(np.concatenate(pair) for pair in zip(closed, last))
+
+
+class NoteSegmenter:
+    """
+    Incremental form of `segment_notes` for pitch tracks that arrive in chunks.
+
+    `feed` returns the notes that were closed by the new frames; the note still
+    open at the end of a chunk is carried over as running sums, so memory does
+    not grow with the length of the track. Call `finish` once the track ends
+    to flush the last note.
+    """
+
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD, max_gap=MAX_GAP, max_slope=MAX_SLOPE,
+                 min_duration=MIN_DURATION):
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.max_slope = max_slope
+        self.min_duration = min_duration
+        # Open note as (start_time, last_time, last_frequency, weighted_sum, confidence_sum)
+        self._open = None
+
+    def feed(self, time, frequency, confidence):
+        time = np.asarray(time, dtype=np.float64)
+        frequency = np.asarray(frequency, dtype=np.float64)
+        confidence = np.asarray(confidence)
+
+        voiced = confidence > self.threshold
+        time = time[voiced]
+        frequency = frequency[voiced]
+        confidence = confidence[voiced].astype(np.float64)
+        if len(time) == 0:
+            return _no_notes()
+
+        starts = np.concatenate(([0], np.flatnonzero(
+            split_points(time, frequency, self.max_gap, self.max_slope)) + 1))
+        ends = np.concatenate((starts[1:], [len(time)])) - 1
+
+        start_times = time[starts]
+        end_times = time[ends]
+        weighted_sums = np.add.reduceat(frequency * confidence, starts)
+        confidence_sums = np.add.reduceat(confidence, starts)
+
+        closed = _no_notes()
+        if self._open is not None:
+            open_start, open_time, open_frequency, open_weighted, open_confidence = self._open
+            if split_points(np.array([open_time, time[0]]), np.array([open_frequency, frequency[0]]),
+                            self.max_gap, self.max_slope)[0]:
+                closed = self._keep(np.array([open_start]), np.array([open_time]),
+                                    np.array([open_weighted / open_confidence]))
+            else:
+                start_times[0] = open_start
+                weighted_sums[0] += open_weighted
+                confidence_sums[0] += open_confidence
+
+        self._open = (start_times[-1], time[-1], frequency[-1], weighted_sums[-1], confidence_sums[-1])
+        notes = self._keep(start_times[:-1], end_times[:-1], weighted_sums[:-1] / confidence_sums[:-1])
+        return tuple(np.concatenate(pair) for pair in zip(closed, notes))
+
+    def close_stale(self, time):
+        """
+        Close the open note if no frame at or after `time` can continue it.
+
+        Lets live callers publish a note once the singer stops, instead of
+        waiting for the next voiced frame to split it off.
+        """
+        if self._open is None or time - self._open[1] <= self.max_gap:
+            return _no_notes()
+        return self.finish()
+
+    def finish(self):
+        if self._open is None:
+            return _no_notes()
+        open_start, open_time, _, open_weighted, open_confidence = self._open
+        self._open = None
+        return self._keep(np.array([open_start]), np.array([open_time]), np.array([open_weighted / open_confidence]))
+
+    def _keep(self, start_times, end_times, frequencies):
+        long_enough = (end_times - start_times) > self.min_duration
+        return start_times[long_enough], end_times[long_enough], frequencies[long_enough]
+
+
+def _no_notes():
+    return np.zeros(0), np.zeros(0), np.zeros(0)
@@ -0,0 +1,132 @@
+import json
+from dataclasses import replace
+
+import numpy as np
+
+from app.config import AnalysisConfig
+from app.model import load_wav, notes_to_dicts, run_crepe
+from app.segmentation import NoteSegmenter
+from app.vad import n_frames, predict_regions, voiced_regions
+from app.viterbi import ViterbiDecoder, cents_to_frequency
+
+CHUNK_SECONDS = 30
+# Smaller chunks for streamed HTTP responses: the first note goes out after
+# roughly one chunk of processing instead of the whole clip
+RESPONSE_CHUNK_SECONDS = 5
+
+
+def open_wav(source):
+    """
+    Open a WAV for chunked reading. Paths are memory-mapped so only the
+    chunks being analyzed are paged in; file-like objects are decoded as usual.
+    """
+    if isinstance(source, str):
+        from scipy.io import wavfile
+        return wavfile.read(source, mmap=True)
+    return load_wav(source)
+
+
+def stream_pitch(audio, sr, config, chunk_seconds=CHUNK_SECONDS):
+    """
+    Run CREPE over overlapping chunks of `audio` and yield (time, frequency,
+    confidence) per chunk, with timestamps on the global frame grid.
+
+    Peak memory follows `chunk_seconds`: only one chunk's framed matrix and
+    activation exist at a time. With config.vad, CREPE only runs on the parts
+    of each chunk that fall in a voiced region of the whole recording.
+
+    Viterbi decoding runs across chunk edges (see `decode_chunks`), so the
+    pitch track matches a whole-file `vad.predict_voiced` run with the same
+    config; frames are yielded once their path is settled, typically a few
+    frames behind the newest one.
+    """
+    total = n_frames(audio, sr, config.step_size)
+    frames_per_chunk = max(1, int(chunk_seconds * 1000 / config.step_size))
+    regions = voiced_regions(audio, sr, config.step_size) if config.vad else [(0, total)]
+    raw = replace(config, viterbi=False)
+
+    def chunks():
+        for first in range(0, total, frames_per_chunk):
+            last = min(first + frames_per_chunk, total)
+            time, frequency, confidence, activation = predict_regions(audio, sr, raw, regions, run_crepe, first, last)
+            yield time, frequency, confidence, activation
+
+    if not config.viterbi:
+        for time, frequency, confidence, _ in chunks():
+            yield time, frequency, confidence
+        return
+    yield from decode_chunks(chunks())
+
+
+def decode_chunks(chunks):
+    """
+    Viterbi-decode a stream of (time, frequency, confidence, activation)
+    chunks as one sequence and yield (time, frequency, confidence) for the
+    frames whose path is settled. Frames with an all-zero activation (skipped
+    by the silence gate) bypass the decoder and keep 0 Hz, so the result is
+    that of one `viterbi_cents` call over the analyzed frames of the whole
+    stream, as in `vad.predict_voiced`.
+    """
+    decoder = ViterbiDecoder()
+    time = np.zeros(0)
+    confidence = np.zeros(0, dtype=np.float32)
+    analyzed = np.zeros(0, dtype=bool)
+
+    def settled(cents, flush=False):
+        # Release pending frames up to the last analyzed one the decoder has decided
+        nonlocal time, confidence, analyzed
+        if flush:
+            count = len(analyzed)
+        elif len(cents):
+            count = np.flatnonzero(analyzed)[len(cents) - 1] + 1
+        else:
+            count = 0
+        frequency = np.zeros(count)
+        frequency[analyzed[:count]] = cents_to_frequency(cents)
+        result = time[:count], frequency, confidence[:count]
+        time, confidence, analyzed = time[count:], confidence[count:], analyzed[count:]
+        return result
+
+    for chunk_time, _, chunk_confidence, activation in chunks:
+        chunk_analyzed = activation.any(axis=1)
+        time = np.concatenate((time, chunk_time))
+        confidence = np.concatenate((confidence, chunk_confidence))
+        analyzed = np.concatenate((analyzed, chunk_analyzed))
+        yield settled(decoder.feed(activation[chunk_analyzed]))
+    yield settled(decoder.finish(), flush=True)
+
+
+def stream_notes(source, config=None, chunk_seconds=CHUNK_SECONDS):
+    """
+    Analyze a WAV chunk by chunk and yield notes (same dicts as analyze_audio_old)
+    as soon as the grouping logic closes them.
+
+    Args:
+        source: Path to a WAV file, a file-like object, or a (sample rate, samples) tuple
+    """
+    config = config or AnalysisConfig()
+    sr, audio = source if isinstance(source, tuple) else open_wav(source)
+    segmenter = NoteSegmenter(**config.segmentation_params())
+    for time, frequency, confidence in stream_pitch(audio, sr, config, chunk_seconds=chunk_seconds):
+        yield from notes_to_dicts(*segmenter.feed(time, frequency, confidence))
+    yield from notes_to_dicts(*segmenter.finish())
+
+
+def ndjson_lines(notes):
+    """Encode notes as newline-delimited JSON, reporting a failure as a final error line."""
+    try:
+        for note in notes:
+            yield json.dumps(note) + '\n'
+    except Exception as e:
+        yield json.dumps({'error': str(e)}) + '\n'
+
+
+def sse_events(notes):
+    """Encode notes as server-sent events, ending with a `done` (or `error`) event."""
+    try:
+        for note in notes:
+            yield f'event: note\ndata: {json.dumps(note)}\n\n'
+    except Exception as e:
+        yield f'event: error\ndata: {json.dumps({"error": str(e)})}\n\n'
+        return
+    yield 'event: done\ndata: {}\n\n'
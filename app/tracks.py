@@ -0,0 +1,117 @@
+"""
+Persisted pitch tracks: the output of CREPE, stored so note segmentation can
+be re-run with different parameters without running the model again.
+
+A track is a directory holding one .npy file per array (time, frequency,
+confidence and optionally activation) plus meta.json. Arrays are loaded
+memory-mapped, so segmenting an hour-long track only pages in what it reads.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+TRACK_DIR = os.environ.get('PITCH_TRACK_DIR') or os.path.join(tempfile.gettempdir(), 'crepe-tracks')
+TRACK_MAX_MB = float(os.environ.get('PITCH_TRACK_MAX_MB', 4096))
+
+TRACK_FIELDS = ('time', 'frequency', 'confidence', 'activation')
+TRACK_ID = re.compile(r'^[0-9a-f]{40}$')
+
+
+def save_track(path, track):
+    """
+    Write a track dict ({'time', 'frequency', 'confidence', optional
+    'activation', 'meta'}) to the directory `path`. The directory appears
+    atomically, so readers never see a half-written track.
+    """
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    os.makedirs(tmp_path)
+    for name in TRACK_FIELDS:
+        if track.get(name) is not None:
+            np.save(os.path.join(tmp_path, name + '.npy'), track[name])
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(track.get('meta', {}), f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another writer stored the same track first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_track(path, mmap=True):
+    """Read a track written by `save_track`; arrays are memory-mapped unless mmap is False."""
+    track = {}
+    for name in TRACK_FIELDS:
+        array_path = os.path.join(path, name + '.npy')
+        if os.path.exists(array_path):
+            track[name] = np.load(array_path, mmap_mode='r' if mmap else None)
+    with open(os.path.join(path, 'meta.json')) as f:
+        track['meta'] = json.load(f)
+    return track
+
+
+def _track_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class TrackStore:
+    """
+    Directory of tracks addressed by ID (see app.model.track_id). Least
+    recently used tracks are deleted once the store grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=TRACK_DIR, max_bytes=TRACK_MAX_MB * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, track_id):
+        if not TRACK_ID.match(track_id):
+            raise KeyError(track_id)
+        return os.path.join(self.directory, track_id)
+
+    def __contains__(self, track_id):
+        try:
+            return os.path.isdir(self._path(track_id))
+        except KeyError:
+            return False
+
+    def get(self, track_id):
+        """The stored track, or None if the ID is unknown (or was evicted)."""
+        try:
+            path = self._path(track_id)
+            track = load_track(path)
+            os.utime(path)  # mark as recently used for eviction
+        except (KeyError, OSError, ValueError):
+            return None
+        return track
+
+    def put(self, track_id, track):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(track_id)
+        if not os.path.isdir(path):
+            save_track(path, track)
+            self._evict()
+
+    def _evict(self):
+        tracks = []
+        for entry in os.scandir(self.directory):
+            if not TRACK_ID.match(entry.name):
+                continue
+            try:
+                tracks.append((entry.stat().st_mtime, _track_bytes(entry.path), entry.path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in tracks)
+        for _, size, path in sorted(tracks):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+track_store = TrackStore()
@@ -0,0 +1,138 @@
+from dataclasses import replace
+
+import numpy as np
+
+from app.viterbi import cents_to_frequency, viterbi_cents
+
+# Frames quieter than this, relative to the loudest frame, count as silence
+THRESHOLD_DB = -40
+# Voiced regions are widened by this much on each side so onsets and releases
+# are still analyzed
+PAD_SECONDS = 0.1
+# Shorter silences are analyzed anyway: splitting there saves little and
+# would cut notes around a breath
+MIN_SILENCE_SECONDS = 0.3
+# CREPE looks at 1024 samples at 16 kHz around each frame
+WINDOW_SECONDS = 1024 / 16000
+# Extra frames of audio on each side of a region, so frames at the edges see
+# the same 64 ms window (and resampler support) as in a whole-file run
+CONTEXT_FRAMES = 8
+# Samples squared at a time, so the energy pass stays flat on long (memory-mapped) files
+SCAN_SAMPLES = 2 ** 20
+
+
+def n_frames(audio, sr, step_size):
+    """Number of frames CREPE produces for `audio` with center=True."""
+    return 1 + int(len(audio) / (sr * step_size / 1000.0))
+
+
+def frame_energy_db(audio, sr, step_size=10):
+    """
+    Mean power (in dB) of the audio around each CREPE frame.
+
+    Power is accumulated in hop-sized blocks and averaged over roughly one
+    CREPE window per frame, so the cost is a single pass over the samples.
+    """
+    block = max(1, int(sr * step_size / 1000.0))
+    n_blocks = -(-len(audio) // block)
+    power = np.zeros(max(1, n_blocks))
+
+    span = block * max(1, SCAN_SAMPLES // block)
+    for start in range(0, len(audio), span):
+        chunk = np.asarray(audio[start:start + span], dtype=np.float64)
+        if chunk.ndim > 1:
+            chunk = chunk.mean(axis=1)
+        starts = np.arange(0, len(chunk), block)
+        counts = np.diff(np.append(starts, len(chunk)))
+        power[start // block:start // block + len(starts)] = np.add.reduceat(chunk ** 2, starts) / counts
+
+    width = max(1, int(round(WINDOW_SECONDS * sr / block)))
+    power = np.convolve(power, np.ones(width) / width, mode='same')
+
+    hop = sr * step_size / 1000.0
+    index = np.minimum((np.arange(n_frames(audio, sr, step_size)) * hop).astype(np.int64) // block, len(power) - 1)
+    return 10 * np.log10(power[index] + 1e-20)
+
+
+def voiced_regions(audio, sr, step_size=10, threshold_db=THRESHOLD_DB, pad_seconds=PAD_SECONDS,
+                   min_silence_seconds=MIN_SILENCE_SECONDS):
+    """
+    Frame ranges worth running CREPE on.
+
+    Returns:
+        List of (first_frame, last_frame) pairs, end exclusive, on the frame
+        grid of a whole-file CREPE run with the same `step_size`
+    """
+    energy = frame_energy_db(audio, sr, step_size)
+    voiced = np.concatenate(([False], energy > energy.max() + threshold_db, [False]))
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1])
+    starts, ends = edges[::2], edges[1::2]
+    if len(starts) == 0:
+        return []
+
+    # Bridge silences that would be shorter than `min_silence_seconds` once padded
+    frames_per_second = 1000.0 / step_size
+    pad = int(round(pad_seconds * frames_per_second))
+    bridge = (starts[1:] - ends[:-1]) < int(round(min_silence_seconds * frames_per_second)) + 2 * pad
+    starts = np.concatenate((starts[:1], starts[1:][~bridge]))
+    ends = np.concatenate((ends[:-1][~bridge], ends[-1:]))
+
+    starts = np.maximum(starts - pad, 0)
+    ends = np.minimum(ends + pad, len(energy))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def predict_regions(audio, sr, config, regions, predict, first=0, last=None):
+    """
+    Run `predict` only on the frames in `regions` and lay the results out on
+    the full frame grid [first, last). Frames outside every region get zero
+    frequency, confidence and activation, so the note grouping drops them.
+
+    Args:
+        predict: Callable (audio, sr, config) returning crepe.predict's
+            (time, frequency, confidence, activation)
+    """
+    step_size = config.step_size
+    hop = sr * step_size / 1000.0
+    last = n_frames(audio, sr, step_size) if last is None else last
+
+    frequency = np.zeros(last - first)
+    confidence = np.zeros(last - first, dtype=np.float32)
+    activation = np.zeros((last - first, 360), dtype=np.float32)
+    for region_first, region_last in regions:
+        region_first, region_last = max(region_first, first), min(region_last, last)
+        if region_last <= region_first:
+            continue
+        begin = max(0, int(round((region_first - CONTEXT_FRAMES) * hop)))
+        end = min(len(audio), int(round((region_last - 1 + CONTEXT_FRAMES) * hop)) + 1)
+        _, region_frequency, region_confidence, region_activation = predict(audio[begin:end], sr, config)
+
+        # Local frame j sits at global frame j + offset; keep this region's share only
+        offset = int(round(begin / hop))
+        keep = slice(region_first - offset, region_last - offset)
+        target = slice(region_first - first, region_first - first + len(region_frequency[keep]))
+        frequency[target] = region_frequency[keep]
+        confidence[target] = region_confidence[keep]
+        activation[target] = region_activation[keep]
+
+    time = np.arange(first, last) * step_size / 1000.0
+    return time, frequency, confidence, activation
+
+
+def predict_voiced(audio, sr, config, predict):
+    """
+    `predict` on the whole clip, or only on its voiced regions when config.vad
+    is set. Regions are then Viterbi-decoded together as one sequence, as
+    `streaming.decode_chunks` does, rather than each on its own.
+    """
+    if not config.vad:
+        return predict(audio, sr, config)
+    regions = voiced_regions(audio, sr, config.step_size)
+    time, frequency, confidence, activation = predict_regions(
+        audio, sr, replace(config, viterbi=False), regions, predict)
+    if config.viterbi:
+        # Frames outside the regions keep 0 Hz and don't enter the decoder
+        analyzed = activation.any(axis=1)
+        frequency = np.zeros(len(time))
+        frequency[analyzed] = cents_to_frequency(viterbi_cents(activation[analyzed]))
+    return time, frequency, confidence, activation
@@ -0,0 +1,225 @@
+"""
+Viterbi decoding of CREPE activations without hmmlearn.
+
+crepe.core.to_viterbi_cents builds a dense 360x360 HMM and decodes it with
+hmmlearn, which costs O(states²) per frame. Its transition matrix is zero
+outside 11 bins of the diagonal and its emission matrix is a constant plus a
+bonus on the diagonal, so the same path can be found in O(states·band) per
+frame. Scores are accumulated in the same order as hmmlearn, and ties
+between predecessors go to the highest state as in hmmlearn's traceback, so
+the decoded state path is identical; the cents averaged around it can differ
+from crepe's in the last digits, as the sums run in a different order.
+
+The forward pass is compiled with numba when it is installed (set
+CREPE_VITERBI_NUMBA=0 to use the NumPy version), and ViterbiDecoder runs it
+incrementally on chunks of activations.
+"""
+import os
+
+import numpy as np
+
+from app import pitch
+
+USE_NUMBA = os.environ.get('CREPE_VITERBI_NUMBA', '1') == '1'
+
+N_STATES = 360
+# Transitions further than this many bins have zero probability
+MAX_STEP = 11
+SELF_EMISSION = 0.1
+CENTS_MAPPING = np.linspace(0, 7180, N_STATES) + 1997.3794084376191
+
+
+def _hmm_parameters():
+    # Same transition and emission matrices as crepe.core.to_viterbi_cents, restricted to the band
+    xx, yy = np.meshgrid(range(N_STATES), range(N_STATES))
+    transition = np.maximum(12 - abs(xx - yy), 0)
+    transition = transition / np.sum(transition, axis=1)[:, None]
+    with np.errstate(divide='ignore'):
+        log_transition = np.log(transition)
+
+    # band[j, k] is the log probability of moving from state j + k - MAX_STEP to state j
+    offsets = np.arange(-MAX_STEP, MAX_STEP + 1)
+    sources = np.arange(N_STATES)[:, None] + offsets
+    valid = (sources >= 0) & (sources < N_STATES)
+    sources = np.clip(sources, 0, N_STATES - 1)
+    band = np.where(valid, log_transition[sources, np.arange(N_STATES)[:, None]], -np.inf)
+
+    emission = np.eye(N_STATES) * SELF_EMISSION + np.ones((N_STATES, N_STATES)) * ((1 - SELF_EMISSION) / N_STATES)
+    log_emission = np.log(emission)
+    log_start = np.log(np.ones(N_STATES) / N_STATES)
+    return log_start, band, sources, log_emission[0, 0], log_emission[0, 1]
+
+
+LOG_START, LOG_TRANSITION_BAND, BAND_SOURCES, LOG_HIT, LOG_MISS = _hmm_parameters()
+
+
+def _forward_numpy(scores, observations, band, sources, log_hit, log_miss, pointers):
+    rows = np.arange(N_STATES)
+    for t, observation in enumerate(observations):
+        candidates = scores[sources] + band
+        # Last maximum wins, like hmmlearn
+        best = band.shape[1] - 1 - candidates[:, ::-1].argmax(axis=1)
+        pointers[t] = sources[rows, best]
+        emission = np.full(N_STATES, log_miss)
+        emission[observation] = log_hit
+        scores = candidates[rows, best] + emission
+    return scores
+
+
+_forward_numba = None
+
+
+def _forward(scores, observations, pointers):
+    """Advance the lattice over `observations`, filling the backpointers; returns the last row."""
+    global _forward_numba, USE_NUMBA
+    if USE_NUMBA and _forward_numba is None:
+        try:
+            import numba
+        except ImportError:
+            USE_NUMBA = False
+        else:
+            _forward_numba = numba.njit(cache=True)(_forward_loops)
+    if USE_NUMBA:
+        return _forward_numba(scores, observations, LOG_TRANSITION_BAND, LOG_HIT, LOG_MISS, pointers)
+    return _forward_numpy(scores, observations, LOG_TRANSITION_BAND, BAND_SOURCES, LOG_HIT, LOG_MISS, pointers)
+
+
+def _forward_loops(scores, observations, band, log_hit, log_miss, pointers):
+    # Plain loops for numba; same sums and tie-breaking as _forward_numpy
+    n_states = scores.shape[0]
+    width = band.shape[1]
+    half = width // 2
+    scores = scores.copy()
+    next_scores = np.empty_like(scores)
+    for t in range(observations.shape[0]):
+        for j in range(n_states):
+            best = -np.inf
+            best_i = max(j - half, 0)
+            for i in range(max(j - half, 0), min(j + half + 1, n_states)):
+                value = scores[i] + band[j, i - j + half]
+                if value >= best:
+                    best = value
+                    best_i = i
+            pointers[t, j] = best_i
+            next_scores[j] = best + (log_hit if j == observations[t] else log_miss)
+        scores, next_scores = next_scores, scores
+    return scores
+
+
+def _backtrack(pointers, state):
+    """States for every frame covered by `pointers`, ending in `state`."""
+    path = np.empty(len(pointers), dtype=np.int64)
+    for t in range(len(pointers) - 1, -1, -1):
+        path[t] = state
+        state = pointers[t, state]
+    return path
+
+
+def local_average_cents(salience, center=None):
+    """
+    Vectorized crepe.core.to_local_average_cents for a (T, 360) salience
+    matrix: the weighted average cents of the 9 bins around `center` (per
+    frame, default the argmax).
+    """
+    salience = np.asarray(salience)
+    if center is None:
+        center = salience.argmax(axis=1)
+    index = np.asarray(center)[:, None] + np.arange(-4, 5)
+    valid = (index >= 0) & (index < N_STATES)
+    index = np.clip(index, 0, N_STATES - 1)
+    weights = np.where(valid, np.take_along_axis(salience, index, axis=1), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sum(weights * CENTS_MAPPING[index], axis=1) / np.sum(weights, axis=1)
+
+
+def viterbi_path(salience):
+    """Most likely state per frame under CREPE's pitch-continuity HMM."""
+    observations = np.asarray(salience).argmax(axis=1)
+    if len(observations) == 0:
+        return observations
+    pointers = np.zeros((len(observations), N_STATES), dtype=np.int16)
+    scores = LOG_START + np.where(np.arange(N_STATES) == observations[0], LOG_HIT, LOG_MISS)
+    scores = _forward(scores, observations[1:], pointers[1:])
+    return _backtrack(pointers, int(np.argmax(scores)))
+
+
+def cents_to_frequency(cents):
+    # As in crepe.predict: unvoiced frames (NaN cents) get 0 Hz
+    frequency = pitch.cents_to_frequency(cents)
+    frequency[np.isnan(frequency)] = 0
+    return frequency
+
+
+def viterbi_cents(salience):
+    """crepe.core.to_viterbi_cents: cents along the same state path, equal up to float rounding."""
+    return local_average_cents(salience, viterbi_path(salience))
+
+
+class ViterbiDecoder:
+    """
+    Viterbi decoding of an activation stream that arrives in chunks.
+
+    `feed` advances the lattice and returns cents for the frames whose state
+    can no longer change: every path that is still a candidate runs through
+    the same state there. In practice paths merge within a few frames of
+    the newest one, so output lags input by very little and the result is
+    exactly what decoding the whole stream at once gives. If more than
+    `max_lag` frames are still undecided, the oldest ones are committed along
+    the currently best path, which bounds memory at the cost of exactness.
+    Call `finish` at the end of the stream to flush the remaining frames.
+    """
+
+    def __init__(self, max_lag=None):
+        self.max_lag = max_lag
+        self._scores = None
+        self._pointers = np.zeros((0, N_STATES), dtype=np.int16)
+        self._salience = np.zeros((0, N_STATES), dtype=np.float32)
+
+    @property
+    def pending(self):
+        """Frames fed but not yet returned."""
+        return len(self._salience)
+
+    def feed(self, salience):
+        salience = np.asarray(salience)
+        observations = salience.argmax(axis=1)
+        if len(observations) == 0:
+            return np.zeros(0)
+
+        pointers = np.zeros((len(observations), N_STATES), dtype=np.int16)
+        if self._scores is None:
+            self._scores = LOG_START + np.where(np.arange(N_STATES) == observations[0], LOG_HIT, LOG_MISS)
+            self._scores = _forward(self._scores, observations[1:], pointers[1:])
+        else:
+            self._scores = _forward(self._scores, observations, pointers)
+        self._pointers = np.concatenate((self._pointers, pointers))
+        self._salience = np.concatenate((self._salience, salience))
+
+        decided = self._decided()
+        if self.max_lag is not None:
+            decided = max(decided, self.pending - self.max_lag)
+        return self._commit(decided)
+
+    def finish(self):
+        cents = self._commit(self.pending)
+        self._scores = None
+        return cents
+
+    def _decided(self):
+        """Number of leading pending frames every surviving path agrees on."""
+        states = np.arange(N_STATES)
+        for t in range(self.pending - 1, 0, -1):
+            states = np.unique(self._pointers[t, states])
+            if len(states) == 1:
+                return t
+        return 0
+
+    def _commit(self, count):
+        if count <= 0:
+            return np.zeros(0)
+        # Walk back from the best final state to the last frame being committed
+        path = _backtrack(self._pointers, int(np.argmax(self._scores)))[:count]
+        cents = local_average_cents(self._salience[:count], path)
+        self._pointers = self._pointers[count:]
+        self._salience = self._salience[count:]
+        return cents
@@ -0,0 +1,90 @@
+"""
+Benchmark for app.changepoint.
+
+Times PeltL2 against ruptures' Pelt(model="l2") and WindowedPelt against
+ruptures' Pelt(model="rbf") on median-filtered synthetic pitch tracks,
+reporting wall time, peak traced memory and how many rbf breakpoints the
+windowed search finds within a few frames. Then times PeltL2 and
+WindowedPelt on a track too long for whole-track rbf.
+tests/test_changepoint.py checks that PeltL2 finds ruptures' breakpoints.
+Run from the repository root:
+    python -m benchmarks.bench_changepoint
+"""
+import argparse
+import time as timer
+import tracemalloc
+
+import numpy as np
+from ruptures import Pelt
+from scipy import signal
+
+from app.changepoint import PeltL2, WindowedPelt
+from benchmarks.synthetic import synthetic_track
+
+
+def filtered(track):
+    """Confident frames of a (time, frequency, confidence) take, median filtered as in MyOwnCrepe."""
+    _, frequency, confidence = track
+    return signal.medfilt(frequency[confidence > 0.8], kernel_size=21).reshape(-1, 1)
+
+
+def filtered_track(seconds, seed=0):
+    return filtered(synthetic_track(seconds, seed=seed))
+
+
+def measured(algo, data, penalty):
+    """Breakpoints, seconds and peak MB of one fit/predict."""
+    tracemalloc.start()
+    started = timer.perf_counter()
+    bkps = algo.fit(data).predict(pen=penalty)
+    seconds = timer.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return bkps, seconds, peak
+
+
+def matched(reference, bkps, tolerance):
+    """Share of reference breakpoints with a breakpoint in `bkps` within `tolerance` frames."""
+    if len(reference) <= 1:
+        return 1.0
+    bkps = np.asarray(bkps)
+    return np.mean([np.min(np.abs(bkps - bkp)) <= tolerance for bkp in reference[:-1]])
+
+
+def report(name, seconds, peak, extra=""):
+    print(f"{name:>24}: {seconds:7.3f} s, peak {peak:7.1f} MB{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the change-point detectors.")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[30, 90],
+                        help="Lengths of the takes compared against ruptures")
+    parser.add_argument("--long-seconds", type=float, default=600, help="Length of the long-track timing")
+    parser.add_argument("--penalty", type=float, default=10)
+    parser.add_argument("--tolerance", type=int, default=5, help="Frames a windowed rbf breakpoint may move")
+    args = parser.parse_args()
+
+    for seconds in args.seconds:
+        data = filtered_track(seconds)
+        print(f"{seconds:.0f} s take, {len(data)} frames")
+        _, l2_seconds, l2_peak = measured(Pelt(model="l2"), data, args.penalty)
+        report("ruptures l2", l2_seconds, l2_peak)
+        _, l2_seconds, l2_peak = measured(PeltL2(), data, args.penalty)
+        report("PeltL2", l2_seconds, l2_peak)
+
+        reference, rbf_seconds, rbf_peak = measured(Pelt(model="rbf"), data, args.penalty)
+        report("ruptures rbf", rbf_seconds, rbf_peak, f", {len(reference) - 1} breakpoints")
+        bkps, rbf_seconds, rbf_peak = measured(WindowedPelt(model="rbf"), data, args.penalty)
+        report("WindowedPelt rbf", rbf_seconds, rbf_peak,
+               f", {len(bkps) - 1} breakpoints, {matched(reference, bkps, args.tolerance):.1%} matched")
+
+    data = filtered_track(args.long_seconds)
+    print(f"{args.long_seconds:.0f} s take, {len(data)} frames")
+    _, seconds, peak = measured(PeltL2(), data, args.penalty)
+    report("PeltL2", seconds, peak)
+    _, seconds, peak = measured(WindowedPelt(model="rbf"), data, args.penalty)
+    report("WindowedPelt rbf", seconds, peak)
+
+
+if __name__ == "__main__":
+    main()
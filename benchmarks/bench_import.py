@@ -0,0 +1,91 @@
+"""
+Import times of the Flask service and the batch CLI.
+
+Times `import app.main` and `plato.py --help` in fresh interpreters (best of
+--repeat runs, with CREPE_PRELOAD=0 so the service doesn't start loading a
+model), flags targets over --budget seconds and lists any heavy dependency
+they pulled in: TensorFlow/crepe, matplotlib, ruptures, librosa and the slow
+scipy subpackages must only load on the code path that needs them. With
+--profile, also lists each target's slowest imports. tests/test_import.py
+enforces the budget. Run from the repository root:
+    python -m benchmarks.bench_import --budget 1.0 --profile
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("tensorflow", "keras", "crepe", "matplotlib", "ruptures", "librosa", "numba", "sklearn", "hmmlearn",
+         "music21", "resampy", "scipy.io", "scipy.signal", "scipy.stats")
+
+PROBE = """
+import json, sys, time
+already_loaded = set(sys.modules)
+started = time.perf_counter()
+try:
+    {statement}
+except SystemExit:
+    pass
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "modules": sorted(set(sys.modules) - already_loaded)}}))
+"""
+
+TARGETS = {
+    "import app.main": "import app.main",
+    "plato.py --help": ("sys.argv = ['plato.py', '--help']; sys.path.insert(0, 'MyOwnCrepe'); "
+                        "import runpy; runpy.run_path('MyOwnCrepe/plato.py', run_name='__main__')"),
+}
+
+
+def heavy_modules(modules):
+    return [heavy for heavy in HEAVY if any(name == heavy or name.startswith(heavy + ".") for name in modules)]
+
+
+def probe(statement, profile=False):
+    """Seconds taken by `statement` in a fresh interpreter, the modules it imported and -X importtime output."""
+    env = {**os.environ, "CREPE_PRELOAD": "0"}
+    command = [sys.executable] + (["-X", "importtime"] if profile else []) + ["-c", PROBE.format(statement=statement)]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return measured["seconds"], measured["modules"], result.stderr
+
+
+def slowest_imports(importtime, modules, count=10):
+    """(cumulative seconds, module) of the target's top-level imports in -X importtime output, slowest first."""
+    rows = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two more spaces per level
+        if len(name) - len(name.lstrip()) == 1 and name.strip() in modules:
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times and heavy imports.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds each target may take")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the fastest counts")
+    parser.add_argument("--profile", action="store_true", help="Also list each target's slowest imports")
+    args = parser.parse_args()
+
+    for label, statement in TARGETS.items():
+        runs = [probe(statement) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        heavy = heavy_modules(runs[0][1])
+        over = seconds > args.budget
+        print(f"{label:>16}: {seconds:.3f} s (budget {args.budget:.3f} s){'  OVER BUDGET' if over else ''}")
+        if heavy:
+            print(f"{'':>16}  heavy modules imported: {', '.join(heavy)}")
+        if args.profile:
+            _, modules, importtime = probe(statement, profile=True)
+            for cumulative, name in slowest_imports(importtime, set(modules)):
+                print(f"{'':>18}{cumulative:7.3f} s  {name}")
+
+
+if __name__ == "__main__":
+    main()
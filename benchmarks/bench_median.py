@@ -0,0 +1,48 @@
+"""
+Benchmark for the batched adaptive median filter.
+
+Times MyOwnCrepe.testingPlayground.adaptive_median_filter and the per-frame
+loop it replaced on a long synthetic pitch track; tests/test_median.py
+checks that their outputs are identical. Run from the repository root:
+    python -m benchmarks.bench_median
+"""
+import argparse
+import time as timer
+
+import numpy as np
+
+from MyOwnCrepe.testingPlayground import adaptive_median_filter
+from benchmarks.synthetic import synthetic_track
+
+
+def legacy_adaptive_median_filter(data, max_window):
+    result = np.zeros_like(data)
+    for i in range(len(data)):
+        window = min(max_window, 2 * (i % (max_window // 2)) + 1)
+        start = max(0, i - window // 2)
+        end = min(len(data), i + window // 2 + 1)
+        result[i] = np.median(data[start:end])
+    return result
+
+
+def timed(fn, *args):
+    started = timer.perf_counter()
+    result = fn(*args)
+    return result, timer.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the adaptive median filter.")
+    parser.add_argument("--seconds", type=float, default=600, help="Length of the benchmark track")
+    parser.add_argument("--window", type=int, default=31, help="max_window for the timing")
+    args = parser.parse_args()
+
+    _, frequency, _ = synthetic_track(args.seconds)
+    _, legacy = timed(legacy_adaptive_median_filter, frequency, args.window)
+    _, batched = timed(adaptive_median_filter, frequency, args.window)
+    print(f"{len(frequency)} frames, max_window {args.window}: "
+          f"loop {legacy:.3f} s, batched {batched:.3f} s ({legacy / batched:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
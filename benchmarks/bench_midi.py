@@ -0,0 +1,86 @@
+"""
+Benchmark for the NumPy MIDI writer in app/midi.py.
+
+Times exporting a batch of synthetic transcriptions with the midiutil
+writer export_to_midi replaced, with export_to_midi from note dicts and
+from NoteTracks, and as one multi-track session file. tests/test_midi.py
+checks that the files are byte for byte what midiutil wrote. Needs
+midiutil. Run from the repository root:
+    python -m benchmarks.bench_midi
+"""
+import argparse
+import io
+import math
+import time as timer
+
+import numpy as np
+from midiutil import MIDIFile
+
+from app.model import export_session_to_midi, export_to_midi
+from app.notes import NoteTrack
+
+
+def legacy_export_to_midi(notes, output_file, tempo=120):
+    midi = MIDIFile(1)
+    track = 0
+    time = 0
+    channel = 0
+    volume = 100
+    midi.addTempo(track, time, tempo)
+
+    def freq_to_midi_note(freq):
+        if freq <= 0: return 0
+        return int(round(69 + 12 * math.log2(freq / 440.0)))
+
+    for note in notes:
+        midi_note = freq_to_midi_note(note["frequency"])
+        midi_time = note["startTime"] * (tempo / 60.0)
+        midi_duration = note["duration"] * (tempo / 60.0)
+        midi.addNote(track, channel, midi_note, midi_time, midi_duration, volume)
+    midi.writeFile(output_file)
+
+
+def synthetic_notes(count, seed=0, overlaps=False):
+    """Note dicts as analyze_audio returns them; with `overlaps`, notes of different pitches overlap."""
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(0.06, 1.5, count)
+    if overlaps:
+        # Cycling through 48 pitches keeps same-pitch notes apart (midiutil mangles those)
+        start = np.sort(rng.uniform(0, count * 0.5, count))
+        midi = np.arange(count) % 48 + 36 + rng.uniform(-0.45, 0.45, count)
+    else:
+        start = np.cumsum(rng.uniform(0.01, 0.5, count) + np.concatenate(([0], durations[:-1])))
+        midi = rng.integers(36, 84, count) + rng.uniform(-0.45, 0.45, count)
+    return NoteTrack(start, start + durations, midi=midi).to_dicts()
+
+
+def legacy_bytes(notes, tempo=120):
+    buffer = io.BytesIO()
+    legacy_export_to_midi(notes, buffer, tempo)
+    return buffer.getvalue()
+
+
+def timed(fn, *args):
+    started = timer.perf_counter()
+    fn(*args)
+    return timer.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the MIDI writer.")
+    parser.add_argument("--clips", type=int, default=200, help="Transcriptions in the timed batch")
+    parser.add_argument("--notes", type=int, default=500, help="Notes per transcription")
+    args = parser.parse_args()
+
+    batch = [synthetic_notes(args.notes, seed) for seed in range(args.clips)]
+    tracks = [NoteTrack.from_dicts(notes) for notes in batch]
+    legacy = timed(lambda: [legacy_bytes(notes) for notes in batch])
+    per_clip = timed(lambda: [export_to_midi(notes, None) for notes in batch])
+    from_tracks = timed(lambda: [export_to_midi(track, None) for track in tracks])
+    session = timed(export_session_to_midi, tracks, None)
+    print(f"{args.clips} clips x {args.notes} notes: midiutil {legacy:.3f} s, NumPy {per_clip:.3f} s "
+          f"({legacy / per_clip:.0f}x), from NoteTracks {from_tracks:.3f} s, one session file {session:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
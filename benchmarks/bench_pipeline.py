@@ -0,0 +1,226 @@
+"""
+Per-stage wall time and memory of each transcription pipeline.
+
+Runs the pipelines over the WAV files in audio/ (or the files given on the
+command line) plus synthetic takes of configurable length, calling their
+stages one by one in the order the pipeline runs them:
+
+    app         app.model.analyze_audio_old, then export_to_midi
+    model       MyOwnCrepe.model.analyze_and_plot_audio without the plot
+    myCrepe     MyOwnCrepe.myCrepe.detect_notes on the linearized track
+    playground  MyOwnCrepe.testingPlayground.analyze_and_plot_audio without the plot
+
+Stages are decode, framing, inference, viterbi, filtering, segmentation and
+midi (app only). Each stage is timed on its own, then run again under
+tracemalloc for its peak Python/NumPy allocation (TensorFlow's own buffers
+are not traced; max_rss_mb covers them). Results are written as JSON; pass a
+previous result file to --baseline to flag stages that got slower. Needs the
+CREPE weights. Run from the repository root:
+    python -m benchmarks.bench_pipeline --capacity tiny --synthetic-seconds 60 600
+"""
+import argparse
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time as timer
+import tracemalloc
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import scipy.signal  # noqa: F401  (imported lazily by own_model.filter_frequency; load it before timing)
+from crepe.core import build_and_load_model
+from scipy.io import wavfile
+
+from app.config import AnalysisConfig
+from app.model import export_to_midi, group_notes, load_wav
+from app.scheduler import activation_to_pitch, frame_audio
+from MyOwnCrepe import model as own_model, myCrepe, testingPlayground
+from benchmarks.synthetic import synthetic_audio
+
+PIPELINES = ("app", "model", "myCrepe", "playground")
+
+
+def pipeline_config(name, capacity=None):
+    """The analysis settings each pipeline uses by default; capacity overrides the model size."""
+    config = {
+        "app": AnalysisConfig(),
+        "model": AnalysisConfig(model_capacity="full", confidence_threshold=0.85),
+        "myCrepe": AnalysisConfig(model_capacity="full", confidence_threshold=0.8),
+        "playground": AnalysisConfig(model_capacity="full", confidence_threshold=0.80),
+    }[name]
+    return AnalysisConfig(**{**config.as_dict(), "model_capacity": capacity}) if capacity else config
+
+
+class StageTimer:
+    """Runs stages and records seconds, traced peak MB and process max RSS for each."""
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+
+    def __call__(self, name, fn, *args, **kwargs):
+        started = timer.perf_counter()
+        result = fn(*args, **kwargs)
+        entry = {"seconds": timer.perf_counter() - started}
+        if self.memory:
+            tracemalloc.start()
+            fn(*_rewound(args), **kwargs)
+            entry["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        entry["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stages[name] = entry
+        return result
+
+
+def _rewound(args):
+    # Decoding reads from a buffer; start it over for the memory pass
+    for arg in args:
+        if hasattr(arg, "seek"):
+            arg.seek(0)
+    return args
+
+
+def run_pitch_stages(stage, source, config, model):
+    sr, audio = stage("decode", load_wav, source)
+    frames = stage("framing", frame_audio, audio, sr, config.step_size)
+    activation = stage("inference", model.predict, frames, verbose=0)
+    time, frequency, confidence, _ = stage("viterbi", activation_to_pitch, activation, config.viterbi,
+                                           config.step_size)
+    return sr, audio, time, frequency, confidence
+
+
+def run_pipeline(name, source, config, model, memory=True):
+    stage = StageTimer(memory)
+    sr, audio, time, frequency, confidence = run_pitch_stages(stage, source, config, model)
+    frames = len(time)
+
+    if name == "app":
+        # group_notes filters by confidence itself, so there is no separate filtering stage
+        notes = stage("segmentation", group_notes, time, frequency, confidence, **config.segmentation_params())
+        stage("midi", export_to_midi, notes, io.BytesIO())
+        note_count = len(notes)
+    elif name == "model":
+        time, frequency, frequency_median = stage("filtering", own_model.filter_frequency, time, frequency,
+                                                  confidence, config.confidence_threshold, 99)
+        segmented = stage("segmentation", own_model.segment_frequency, frequency_median, 10, 10)
+        # Each kept segment is a run of one nonzero value
+        note_count = np.count_nonzero((np.diff(segmented, prepend=0) != 0) & (segmented != 0))
+    elif name == "myCrepe":
+        t, f, c = stage("filtering", myCrepe.linearized_data, time, frequency, confidence,
+                        config.confidence_threshold)
+        notes = stage("segmentation", myCrepe.detect_notes, t, f, c, time_th=0.05, ext_time_th=0.1, pitch_th=4.0)
+        note_count = len(notes)
+    else:
+        keep = confidence > config.confidence_threshold
+        time = time[keep]
+        frequency_median = stage("filtering", testingPlayground.adaptive_median_filter, frequency[keep], 31)
+        # Whole-track rbf would need tens of GB on the longer synthetic takes
+        change_points = stage("segmentation", testingPlayground.robust_change_point_detection, frequency_median, 20,
+                              method="windowed-rbf")
+        note_count = len(testingPlayground.improved_segmentation(time, frequency_median, change_points, 0.1))
+
+    return {
+        "pipeline": name,
+        "capacity": config.model_capacity,
+        "audio_seconds": len(audio) / sr,
+        "frames": frames,
+        "notes": int(note_count),
+        "total_seconds": sum(entry["seconds"] for entry in stage.stages.values()),
+        "stages": stage.stages,
+    }
+
+
+def wav_buffer(sr, audio):
+    buffer = io.BytesIO()
+    wavfile.write(buffer, sr, audio)
+    buffer.seek(0)
+    return buffer
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def regressions(baseline, runs, tolerance, min_seconds):
+    """(pipeline, input, stage, old seconds, new seconds) for every stage more than `tolerance` times slower."""
+    old = {(run["pipeline"], run["input"]): run["stages"] for run in baseline["runs"]}
+    slower = []
+    for run in runs:
+        for name, entry in run["stages"].items():
+            before = old.get((run["pipeline"], run["input"]), {}).get(name)
+            if before and entry["seconds"] > max(before["seconds"] * tolerance, min_seconds):
+                slower.append((run["pipeline"], run["input"], name, before["seconds"], entry["seconds"]))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each pipeline stage over the audio corpus.")
+    parser.add_argument("files", nargs="*", help="WAV files (default: audio/*.wav)")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+    parser.add_argument("--capacity", help="Model capacity for every pipeline (default: each pipeline's own)")
+    parser.add_argument("--synthetic-seconds", type=float, nargs="*", default=[60],
+                        help="Lengths of synthetic takes to add")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the tracemalloc pass (halves the run time)")
+    parser.add_argument("--output", default="bench_pipeline.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Slowdown factor reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Ignore regressions in faster stages")
+    args = parser.parse_args()
+
+    inputs = [(path, path) for path in (args.files or sorted(glob.glob("audio/*.wav")))]
+    inputs += [(f"synthetic:{seconds:g}s", synthetic_audio(seconds)) for seconds in args.synthetic_seconds]
+
+    models = {}
+    runs = []
+    print(f"{'pipeline':>10} {'input':>32} {'total s':>8}  stages (s / peak MB)")
+    for name in args.pipelines:
+        config = pipeline_config(name, args.capacity)
+        if config.model_capacity not in models:
+            models[config.model_capacity] = model = build_and_load_model(config.model_capacity)
+            # Warm up the model and compile the Viterbi pass outside the timings, as app.registry does,
+            # and the resampler, which is imported and compiled by the first non-16 kHz input
+            activation_to_pitch(model.predict(np.zeros((2, 1024), dtype=np.float32), verbose=0))
+            frame_audio(np.zeros(4410, dtype=np.int16), 44100, config.step_size)
+        for label, source in inputs:
+            source = wav_buffer(*source) if isinstance(source, tuple) else source
+            run = {"input": label, **run_pipeline(name, source, config, models[config.model_capacity], args.memory)}
+            runs.append(run)
+            stages = "  ".join(f"{stage} {entry['seconds']:.3f}" + (f"/{entry['peak_mb']:.0f}" if args.memory else "")
+                               for stage, entry in run["stages"].items())
+            print(f"{name:>10} {label[-32:]:>32} {run['total_seconds']:8.2f}  {stages}")
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "runs": runs}, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(json.load(f), runs, args.tolerance, args.min_seconds)
+        for pipeline, label, stage, before, after in slower:
+            print(f"REGRESSION {pipeline} {label} {stage}: {before:.3f} s -> {after:.3f} s")
+        if slower:
+            sys.exit(1)
+        print(f"No stage slower than {args.tolerance}x the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark for the vectorized pitch math in app/pitch.py.
+
+Times note names and MIDI note numbers for a long transcription with the
+scalar helpers they replaced (app.model.frequency_to_note and the MIDI
+export's freq_to_midi_note) and with app.pitch. tests/test_pitch.py checks
+every function against the old helpers. Run from the repository root:
+    python -m benchmarks.bench_pitch
+"""
+import argparse
+import math
+import time as timer
+
+import numpy as np
+
+from app import pitch
+from app.notes import NoteTrack
+
+NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def legacy_frequency_to_note(freq):
+    A4 = 440.0
+    C0 = A4 * pow(2, -4.75)
+    h = round(12 * np.log2(freq / C0))
+    octave = h // 12
+    n = h % 12
+    return NAMES[n] + str(octave)
+
+
+def legacy_freq_to_midi_note(freq):
+    if freq <= 0: return 0
+    return int(round(69 + 12 * math.log2(freq / 440.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the vectorized pitch conversions.")
+    parser.add_argument("--notes", type=int, default=100000, help="Notes in the timing run")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    start = np.sort(rng.uniform(0, 3600, args.notes))
+    track = NoteTrack(start, start + rng.uniform(0.05, 1, args.notes), frequency=rng.uniform(50, 2000, args.notes))
+    frequencies = track.frequency.tolist()
+
+    started = timer.perf_counter()
+    [legacy_frequency_to_note(f) for f in frequencies]
+    [legacy_freq_to_midi_note(f) for f in frequencies]
+    loop = timer.perf_counter() - started
+
+    started = timer.perf_counter()
+    track.names()
+    pitch.midi_numbers(track.frequency)
+    vectorized = timer.perf_counter() - started
+    print(f"{args.notes} notes, names and MIDI numbers: loop {loop:.3f} s, vectorized {vectorized:.3f} s "
+          f"({loop / vectorized:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Wall time and accuracy of each analysis preset.
+
+Runs every preset in app.config.PRESETS over the WAV files in audio/ (or the
+files given on the command line) and reports the realtime factor and how
+closely the notes agree with the archival preset. Needs the real CREPE
+weights. Run from the repository root:
+    python -m benchmarks.bench_presets
+"""
+import argparse
+import glob
+import time as timer
+
+import numpy as np
+from crepe.core import build_and_load_model
+
+from app.config import PRESETS
+from app.model import analyze_samples, load_wav
+
+
+def note_agreement(reference, notes, tolerance=0.05):
+    """Fraction of reference notes matched by a note with the same name starting within `tolerance` seconds."""
+    if not reference:
+        return 1.0
+    starts = np.array([note["startTime"] for note in notes])
+    matched = 0
+    for note in reference:
+        close = np.flatnonzero(np.abs(starts - note["startTime"]) <= tolerance)
+        matched += any(notes[i]["name"] == note["name"] for i in close)
+    return matched / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each analysis preset and compare it with archival.")
+    parser.add_argument("files", nargs="*", help="WAV files (default: audio/*.wav)")
+    args = parser.parse_args()
+    files = args.files or sorted(glob.glob("audio/*.wav"))
+
+    # Load every model up front so the first file doesn't pay for it
+    for config in PRESETS.values():
+        build_and_load_model(config.model_capacity)
+
+    print(f"{'preset':>10} {'seconds':>9} {'x realtime':>11} {'notes':>6} {'agreement':>10}")
+    reference = {}
+    for name in ["archival"] + [name for name in PRESETS if name != "archival"]:
+        config = PRESETS[name]
+        elapsed = audio_seconds = 0.0
+        note_count = 0
+        agreement = []
+        for path in files:
+            sr, audio = load_wav(path)
+            started = timer.perf_counter()
+            notes = analyze_samples(audio, sr, config)
+            elapsed += timer.perf_counter() - started
+            audio_seconds += len(audio) / sr
+            note_count += len(notes)
+            reference.setdefault(path, notes)
+            agreement.append(note_agreement(reference[path], notes))
+        print(f"{name:>10} {elapsed:9.2f} {audio_seconds / elapsed:11.1f} {note_count:6d} "
+              f"{np.mean(agreement):10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for the vectorized note grouping.
+
+Times app.model.group_notes and the frame-by-frame loop it replaced on an
+hour-long synthetic track (360k frames); tests/test_segmentation.py checks
+that both find the same notes. Run from the repository root:
+    python -m benchmarks.bench_segmentation
+"""
+import argparse
+import time as timer
+
+import numpy as np
+
+from app.model import frequency_to_note, group_notes
+from benchmarks.synthetic import synthetic_track
+
+
+def legacy_group_notes(time, frequency, confidence, threshold=0.82):
+    # Create an array of tuples and filter by confidence
+    data = [(t, f, c) for t, f, c in zip(time, frequency, confidence) if c > threshold]
+
+    # Extract the filtered values
+    filtered_time = [d[0] for d in data]
+    filtered_frequency = [d[1] for d in data]
+    filtered_confidence = [d[2] for d in data]
+
+    # Group frequencies into notes
+    notes = []
+    current_note = []
+    prev_f = None
+    prev_t = None
+    note_diff = None
+
+    for i in range(len(filtered_time)):
+        if i != 0:
+            note_diff = abs((filtered_frequency[i] - prev_f) / (filtered_time[i] - prev_t))
+        if not current_note:
+            current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
+        else:
+            time_diff = filtered_time[i] - current_note[-1][0]
+            if time_diff <= 0.1 and note_diff is not None and note_diff < 180:
+                current_note.append((filtered_time[i], filtered_frequency[i], filtered_confidence[i]))
+            else:
+                notes.append(current_note)
+                current_note = [(filtered_time[i], filtered_frequency[i], filtered_confidence[i])]
+        prev_t = filtered_time[i]
+        prev_f = filtered_frequency[i]
+
+    if current_note:
+        notes.append(current_note)
+
+    long_notes = []
+    for note_array in notes:
+        time_last, freq_last, conf_last = note_array[-1]
+        time_first, freq_first, conf_first = note_array[0]
+        if (time_last - time_first) > 0.05:
+            long_notes.append(note_array)
+
+    notes = long_notes
+
+    # Calculate weighted average of frequencies for each note and match with initial and ending time
+    weighted_averages = []
+    for note in notes:
+        times, freqs, confs = zip(*note)
+        weighted_avg_freq = np.average(freqs, weights=confs)
+        start_time = times[0]
+        end_time = times[-1]
+        duration = end_time - start_time
+        musical_note = frequency_to_note(weighted_avg_freq)
+        weighted_averages.append({
+            "name": musical_note,
+            "duration": duration,
+            "frequency": weighted_avg_freq,
+            "startTime": start_time
+        })
+
+    return weighted_averages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the vectorized note grouping.")
+    parser.add_argument("--seconds", type=float, default=3600, help="Length of the benchmark track")
+    args = parser.parse_args()
+
+    track = synthetic_track(args.seconds, seed=0)
+    for name, fn in (("loop", legacy_group_notes), ("vectorized", group_notes)):
+        started = timer.perf_counter()
+        notes = fn(*track)
+        print(f"{name:>10}: {timer.perf_counter() - started:.3f} s, {len(notes)} notes from {len(track[0])} frames")
+
+
+if __name__ == "__main__":
+    main()
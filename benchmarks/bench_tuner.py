@@ -0,0 +1,144 @@
+"""
+Benchmark for the slider tuner in MyOwnCrepe/myCrepe.py.
+
+Times one slider update both ways on a synthetic take: the old path
+re-detects notes with the list-based detect_notes and rebuilds both axes,
+the new one re-derives NoteDetector's split mask, moves the notes line with
+set_data and blits it over the cached figure. tests/test_tuner.py checks
+that both detect the same notes. Run from the repository root:
+    python -m benchmarks.bench_tuner --seconds 1200
+"""
+import argparse
+import os
+import time as timer
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from MyOwnCrepe.myCrepe import NoteDetector, NotesBlitter, linearized_data, plot_notes, plot_pitch
+from benchmarks.synthetic import synthetic_track
+
+
+def calculate_weighted_slope(dt, df, c1, c2):
+    avg_confidence = (c1 + c2) / 2
+    confidence_factor = 1 - avg_confidence  # Invert confidence to increase slope for low confidence
+    weighted_slope = abs(df / dt) * (1 + confidence_factor)
+    return weighted_slope
+
+
+def add_point(note, t, f, c, dt, df, time_th, ext_time_th, pitch_th, max_slope):
+    if dt > time_th:
+        if abs(df) <= pitch_th and dt <= ext_time_th:
+            note.append((t, f, c))
+            return note, True
+    else:
+        if len(note) > 0:
+            weighted_slope = calculate_weighted_slope(dt, df, note[-1][2], c)
+            if weighted_slope <= max_slope:
+                note.append((t, f, c))
+                return note, True
+    return note, False
+
+
+def finalize(note, notes, min_points):
+    if len(note) >= min_points:
+        notes.append(note)
+    return notes, []
+
+
+def process_notes(notes):
+    processed = []
+    for note in notes:
+        midi_vals = np.array([point[1] for point in note])
+        confidences = np.array([point[2] for point in note])
+        weighted_log = np.sum(np.log(midi_vals) * confidences) / np.sum(confidences)
+        weighted_mean_midi = np.exp(weighted_log)
+        start = note[0][0]
+        end = note[-1][0]
+        avg_conf = np.mean(confidences)
+        processed.append({
+            'midi': weighted_mean_midi,
+            'start_time': start,
+            'end_time': end,
+            'confidence': avg_conf
+        })
+    return processed
+
+
+def legacy_detect_notes(t, f, c, max_slope=5, min_points=4, time_th=0.05, ext_time_th=0.08, pitch_th=1.0,
+                        conf_th=0.8):
+    notes = []
+    note = []
+    for i in range(len(t)):
+        if c[i] < conf_th:
+            continue
+        if not note:
+            note.append((t[i], f[i], c[i]))
+        else:
+            dt = t[i] - note[-1][0]
+            df = f[i] - note[-1][1]
+            note, added = add_point(note, t[i], f[i], c[i], dt, df, time_th, ext_time_th, pitch_th, max_slope)
+            if not added:
+                notes, note = finalize(note, notes, min_points)
+                note.append((t[i], f[i], c[i]))
+    notes, _ = finalize(note, notes, min_points)
+    return process_notes(notes)
+
+
+def legacy_plot_pitch_and_notes(t, f, c, notes, ax1, ax2):
+    ax1.clear()
+    ax2.clear()
+    ax1.scatter(t, f, c=c, cmap='viridis', vmin=0.8, vmax=1.0)
+    midi_min, midi_max = int(min(f)), int(max(f)) + 1
+    midi_lines = range(midi_min, midi_max + 1)
+    ax1.hlines(midi_lines, min(t), max(t), colors='gray', alpha=0.3, linestyles='dashed')
+    midi_labels = [f"{midi}" for midi in midi_lines[::2]]
+    ax1.set_yticks(midi_lines[::2])
+    ax1.set_yticklabels(midi_labels)
+    ax2.scatter(t, f, c=c, cmap='viridis', vmin=0.8, vmax=1.0, alpha=0.5)
+    for note in notes:
+        ax2.plot([note['start_time'], note['end_time']], [note['midi'], note['midi']], linewidth=2, color='red',
+                 alpha=0.7)
+    ax2.hlines(midi_lines, min(t), max(t), colors='gray', alpha=0.3, linestyles='dashed')
+    ax2.set_yticks(midi_lines[::2])
+    ax2.set_yticklabels(midi_labels)
+
+
+def tuner_data(seconds, seed=0):
+    time, frequency, confidence = synthetic_track(seconds, seed=seed)
+    return linearized_data(time, frequency, confidence, threshold=0.8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a slider update of the tuner.")
+    parser.add_argument("--seconds", type=float, default=1200, help="Length of the timed take (1200 s ~ 100k points)")
+    args = parser.parse_args()
+
+    t, f, c = tuner_data(args.seconds)
+    params = dict(time_th=0.05, ext_time_th=0.1, pitch_th=4.0, max_slope=5)
+    fig, (ax1, ax2) = plt.subplots(2, 1)
+
+    started = timer.perf_counter()
+    legacy_plot_pitch_and_notes(t, f, c, legacy_detect_notes(t, f, c, **params), ax1, ax2)
+    fig.canvas.draw()
+    legacy = timer.perf_counter() - started
+
+    for ax in (ax1, ax2):
+        ax.clear()
+    detector = NoteDetector(t, f, c)
+    notes_line = plot_pitch(t, f, c, ax1, ax2)
+    blitter = NotesBlitter(fig, notes_line, [])
+    fig.canvas.draw()
+    started = timer.perf_counter()
+    plot_notes(notes_line, detector.detect(**params))
+    blitter.redraw()
+    incremental = timer.perf_counter() - started
+
+    print(f"{len(t)} points, one slider update including the redraw: "
+          f"rebuild {legacy:.3f} s, incremental {incremental:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+How much CREPE work the silence gate skips, and what it costs in notes.
+
+For each WAV in audio/ (plus a synthetic sparse take) prints the share of
+frames that would still go through CREPE and the time of the energy pass.
+With --compare, also runs the model with and without gating and reports the
+wall time and note agreement (needs the real CREPE weights). Run from the
+repository root:
+    python -m benchmarks.bench_vad --compare
+"""
+import argparse
+import glob
+import time as timer
+
+import numpy as np
+
+from app.config import AnalysisConfig
+from app.model import analyze_samples, load_wav
+from app.vad import n_frames, voiced_regions
+from benchmarks.bench_presets import note_agreement
+
+
+def sparse_take(seconds=60, sr=16000, seed=0):
+    """Short sung-like tones separated by long, lightly noisy silences."""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 30, int(seconds * sr))
+    position = 0.0
+    while position < seconds - 2:
+        position += rng.uniform(2, 6)
+        length = rng.uniform(0.3, 1.5)
+        t = np.arange(int(length * sr)) / sr
+        start = int(position * sr)
+        tone = 8000 * np.sin(2 * np.pi * rng.uniform(150, 600) * t)
+        audio[start:start + len(tone)] += tone[:len(audio) - start]
+        position += length
+    return sr, np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the frames skipped by silence gating.")
+    parser.add_argument("files", nargs="*", help="WAV files (default: audio/*.wav)")
+    parser.add_argument("--capacity", default="tiny", help="Model capacity for --compare")
+    parser.add_argument("--compare", action="store_true", help="Also run CREPE with and without gating")
+    args = parser.parse_args()
+
+    takes = [("synthetic sparse", sparse_take())]
+    takes += [(path, load_wav(path)) for path in (args.files or sorted(glob.glob("audio/*.wav")))]
+
+    for name, (sr, audio) in takes:
+        started = timer.perf_counter()
+        regions = voiced_regions(audio, sr)
+        scan = timer.perf_counter() - started
+        analyzed = sum(last - first for first, last in regions) / n_frames(audio, sr, 10)
+        line = f"{name:>32}: {analyzed:6.1%} of frames in {len(regions)} regions, scan {scan * 1000:.1f} ms"
+
+        if args.compare:
+            timings = []
+            results = []
+            for vad in (False, True):
+                config = AnalysisConfig(model_capacity=args.capacity, vad=vad)
+                started = timer.perf_counter()
+                results.append(analyze_samples(audio, sr, config))
+                timings.append(timer.perf_counter() - started)
+            line += (f", model {timings[0]:.2f} s -> {timings[1]:.2f} s, "
+                     f"notes kept {note_agreement(*results):.1%}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
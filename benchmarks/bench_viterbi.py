@@ -0,0 +1,48 @@
+"""
+Benchmark for the banded Viterbi decoder.
+
+Times crepe.core.to_viterbi_cents (hmmlearn), the NumPy pass and the numba
+pass of app.viterbi on a synthetic activation matrix; tests/test_viterbi.py
+checks that they decode the same path. Run from the repository root:
+    python -m benchmarks.bench_viterbi
+"""
+import argparse
+import time as timer
+
+from crepe.core import to_viterbi_cents
+
+from app import viterbi
+from benchmarks.synthetic import synthetic_track, track_activation
+
+
+def synthetic_activation(seconds, seed=0):
+    return track_activation(synthetic_track(seconds, seed=seed), seed)
+
+
+def decode(salience, use_numba):
+    viterbi.USE_NUMBA = use_numba
+    return viterbi.viterbi_cents(salience)
+
+
+def timed(fn, *args):
+    started = timer.perf_counter()
+    result = fn(*args)
+    return result, timer.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the banded Viterbi decoder.")
+    parser.add_argument("--seconds", type=float, default=60, help="Length of the benchmark activation")
+    args = parser.parse_args()
+
+    decode(synthetic_activation(1), True)  # compile the numba pass outside the timings
+    salience = synthetic_activation(args.seconds)
+    _, seconds = timed(to_viterbi_cents, salience)
+    print(f"{'hmmlearn':>10}: {seconds:.3f} s for {len(salience)} frames")
+    for name, use_numba in (("numpy", False), ("numba", True)):
+        _, seconds = timed(decode, salience, use_numba)
+        print(f"{name:>10}: {seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Synthetic CREPE-like pitch tracks for benchmarks that don't need the model.
+"""
+import numpy as np
+
+from app.viterbi import CENTS_MAPPING, N_STATES
+
+
+def synthetic_track(seconds, step_size=10, seed=0):
+    """
+    Imitate crepe.predict's (time, frequency, confidence) output for a sung take:
+    held notes with vibrato and glides between them, separated by breaths and
+    silence where confidence collapses.
+    """
+    rng = np.random.default_rng(seed)
+    n_frames = int(seconds * 1000 / step_size) + 1
+    time = np.arange(n_frames) * step_size / 1000.0
+
+    # Piecewise-constant melody, 80 ms to 1.5 s per note, around C3..C5
+    lengths = rng.integers(8, 150, size=n_frames // 8 + 1)
+    midi = rng.integers(48, 72, size=len(lengths)).astype(np.float64)
+    midi_track = np.repeat(midi, lengths)[:n_frames]
+    vibrato = 0.3 * np.sin(2 * np.pi * 5.5 * time)
+    jitter = rng.normal(0, 0.05, n_frames)
+    frequency = 440.0 * 2 ** ((midi_track + vibrato + jitter - 69) / 12)
+
+    # Voiced frames are confident, rests and breaths are not
+    voiced = np.repeat(rng.random(len(lengths)) > 0.2, lengths)[:n_frames]
+    confidence = np.where(voiced, rng.uniform(0.75, 0.99, n_frames), rng.uniform(0.0, 0.5, n_frames))
+    return time, frequency, confidence.astype(np.float32)
+
+
+def track_activation(track, seed=0):
+    """A (T, 360) CREPE-like salience matrix with a bump at each of the track's pitches plus uniform noise."""
+    _, frequency, confidence = track
+    rng = np.random.default_rng(seed)
+    cents = 1200 * np.log2(np.maximum(frequency, 1) / 10)
+    bins = (cents - CENTS_MAPPING[0]) / (CENTS_MAPPING[1] - CENTS_MAPPING[0])
+    bump = np.exp(-0.5 * ((np.arange(N_STATES)[None, :] - bins[:, None]) / 1.5) ** 2)
+    noise = rng.uniform(0, 0.3, (len(frequency), N_STATES))
+    return (bump * confidence[:, None] + noise).astype(np.float32)
+
+
+def synthetic_audio(seconds, sr=16000, seed=0):
+    """
+    Render synthetic_track as audio: a harmonic tone following its pitch,
+    silent where the track is unvoiced, with a little noise throughout.
+    """
+    step_size = 10
+    _, frequency, confidence = synthetic_track(seconds, step_size=step_size, seed=seed)
+    n_samples = int(seconds * sr)
+    # Frame of each sample; works for rates where a hop isn't a whole number of samples (e.g. 22050 Hz)
+    frame = np.minimum(np.arange(n_samples) * 1000 // (step_size * sr), len(frequency) - 1)
+    pitch = frequency[frame]
+    amplitude = np.where(confidence > 0.5, 8000.0, 0.0)[frame]
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    tone = np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase)
+    rng = np.random.default_rng(seed)
+    audio = amplitude * tone / 1.75 + rng.normal(0, 30, n_samples)
+    return sr, np.clip(audio, -32768, 32767).astype(np.int16)
@@ -0,0 +1,29 @@
+"""
+Synthetic takes shared by the equivalence tests. Each test compares an
+optimized code path against the implementation it replaced (kept in the
+matching benchmarks/bench_*.py script) on the same seeded tracks.
+Run from the repository root:
+    python -m pytest tests
+"""
+import pytest
+
+from benchmarks.synthetic import synthetic_audio, synthetic_track
+
+SEEDS = range(5)
+
+
+@pytest.fixture(params=SEEDS)
+def seed(request):
+    return request.param
+
+
+@pytest.fixture
+def track(seed):
+    """(time, frequency, confidence) of a 60 s synthetic take, as crepe.predict returns them."""
+    return synthetic_track(60, seed=seed)
+
+
+@pytest.fixture
+def audio(seed):
+    """(sr, samples) of a 20 s synthetic take rendered as 16 kHz audio."""
+    return synthetic_audio(20, seed=seed)
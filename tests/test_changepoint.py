@@ -0,0 +1,18 @@
+import pytest
+from ruptures import Pelt
+
+from app.changepoint import PeltL2
+from MyOwnCrepe.testingPlayground import robust_change_point_detection
+from benchmarks.bench_changepoint import filtered
+
+
+@pytest.mark.parametrize("penalty", [1, 10, 100])
+def test_pelt_l2_matches_ruptures(track, penalty):
+    data = filtered(track)
+    assert PeltL2().fit(data).predict(pen=penalty) == Pelt(model="l2").fit(data).predict(pen=penalty)
+
+
+def test_playground_defaults_to_whole_track_rbf(track):
+    # Takes longer than one WindowedPelt window, so the windowed search is opt-in
+    data = filtered(track)
+    assert robust_change_point_detection(data.ravel(), 10) == Pelt(model="rbf").fit(data).predict(pen=10)
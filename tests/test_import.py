@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.bench_import import TARGETS, heavy_modules, probe
+
+# Seconds each target may take in a fresh interpreter, best of REPEAT runs
+BUDGET_SECONDS = 1.0
+REPEAT = 3
+
+
+@pytest.mark.parametrize("label", list(TARGETS))
+def test_import_budget(label):
+    runs = [probe(TARGETS[label]) for _ in range(REPEAT)]
+    assert min(seconds for seconds, _, _ in runs) < BUDGET_SECONDS
+    # TensorFlow/crepe, matplotlib, ruptures, librosa, scipy.io... load only on the path that needs them
+    assert heavy_modules(runs[0][1]) == []
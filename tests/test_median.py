@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from MyOwnCrepe.testingPlayground import adaptive_median_filter
+from benchmarks.bench_median import legacy_adaptive_median_filter
+
+
+@pytest.mark.parametrize("max_window", [2, 3, 4, 15, 31, 99, 250])
+@pytest.mark.parametrize("length", [0, 1, 2, 7, 100, 2000])
+def test_adaptive_median_filter_matches_loop(track, length, max_window):
+    data = track[1][:length]
+    np.testing.assert_array_equal(legacy_adaptive_median_filter(data, max_window),
+                                  adaptive_median_filter(data, max_window))
+
+
+@pytest.mark.parametrize("max_window", [-1, 0, 1])
+def test_adaptive_median_filter_rejects_small_windows(max_window):
+    # The loop divided by max_window // 2 and raised ZeroDivisionError
+    with pytest.raises(ValueError):
+        adaptive_median_filter(np.ones(10), max_window)
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("midiutil")
+
+from app.model import export_session_to_midi, export_to_midi, group_notes  # noqa: E402
+from benchmarks.bench_midi import legacy_bytes, synthetic_notes  # noqa: E402
+
+TEMPOS = (60, 120, 97)
+
+
+def chunks(data):
+    """The MTrk chunks of a MIDI file."""
+    tracks, offset = [], 14
+    while offset < len(data):
+        length = int.from_bytes(data[offset + 4:offset + 8], 'big')
+        tracks.append(data[offset:offset + 8 + length])
+        offset += 8 + length
+    return tracks
+
+
+@pytest.mark.parametrize("tempo", TEMPOS)
+def test_transcription_matches_midiutil(track, tempo):
+    notes = group_notes(*track)
+    assert export_to_midi(notes, None, tempo) == legacy_bytes(notes, tempo)
+
+
+@pytest.mark.parametrize("overlaps", [False, True])
+@pytest.mark.parametrize("count", [0, 1, 2, 10, 1000])
+def test_synthetic_notes_match_midiutil(seed, count, overlaps):
+    notes = synthetic_notes(count, seed, overlaps)
+    for tempo in TEMPOS:
+        assert export_to_midi(notes, None, tempo) == legacy_bytes(notes, tempo)
+
+
+def test_session_tracks_match_clips(track):
+    clips = [group_notes(*track), synthetic_notes(50), synthetic_notes(0), synthetic_notes(50, overlaps=True)]
+    names = [f"clip{i}.wav" for i in range(len(clips))]
+    session = chunks(export_session_to_midi(clips, None, names=names))
+    assert len(session) == len(clips) + 1
+    for notes, name, session_track in zip(clips, names, session[1:]):
+        single = chunks(export_to_midi(notes, None))[1]
+        name = name.encode()
+        # The session track is the clip's own track with a track name event in front
+        assert session_track[8:12 + len(name)] == b'\x00\xff\x03' + bytes([len(name)]) + name
+        assert session_track[12 + len(name):] == single[8:]
@@ -0,0 +1,40 @@
+import os
+import runpy
+
+import numpy as np
+from scipy.io import wavfile
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from app import scheduler  # noqa: E402
+from benchmarks.synthetic import synthetic_track  # noqa: E402
+from MyOwnCrepe import model  # noqa: E402
+
+SCRIPT = os.path.join(os.path.dirname(model.__file__), "model.py")
+
+
+def track_predict(seed):
+    """Stand-in for crepe_predict: the synthetic track the `audio` fixture was rendered from."""
+    def predict(audio, sr, viterbi=True, model_capacity='full', step_size=10):
+        time, frequency, confidence = synthetic_track(len(audio) / sr, step_size=step_size, seed=seed)
+        return time, frequency, confidence, np.zeros((len(time), 360), dtype=np.float32)
+    return predict
+
+
+def test_analyze_audio(audio, seed, tmp_path, monkeypatch):
+    monkeypatch.setattr(model, "crepe_predict", track_predict(seed))
+    path = str(tmp_path / "take.wav")
+    wavfile.write(path, *audio)
+
+    notes = model.analyze_audio(path)
+    assert notes and all(note["duration"] > 0 and note["frequency"] > 0 for note in notes)
+    time, segmented = model.analyze_and_plot_audio(path, median_window=21, penalty=5)
+    assert len(time) == len(segmented) and segmented.any()
+
+
+def test_script_entry_point(audio, seed, monkeypatch):
+    # `cd MyOwnCrepe && python model.py` reads ../audio/voice_recording.wav and plots it
+    monkeypatch.setattr(scheduler, "crepe_predict", track_predict(seed))
+    monkeypatch.setattr(wavfile, "read", lambda path: audio)
+    monkeypatch.chdir(os.path.dirname(SCRIPT))
+    runpy.run_path(SCRIPT, run_name="__main__")
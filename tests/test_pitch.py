@@ -0,0 +1,69 @@
+import doctest
+
+import numpy as np
+import pytest
+
+from app import pitch
+from benchmarks.bench_pitch import NAMES, legacy_freq_to_midi_note, legacy_frequency_to_note
+
+
+# myCrepe.linearize and testingPlayground's note_to_freq and note_name, as they were before app.pitch.
+# testingPlayground.freq_to_note isn't compared: it named A4 'C3' and now uses the service's names.
+def legacy_linearize(freq):
+    if freq <= 0:
+        return None
+    return 69 + 12 * np.log2(freq / 440.0)
+
+
+def legacy_note_to_freq(note):
+    return 440 * (2 ** ((note - 69) / 12))
+
+
+def legacy_note_name(midi_note):
+    return NAMES[int(midi_note) % 12] + str(int((midi_note - 12) / 12))
+
+
+@pytest.fixture
+def frequency(track):
+    """Exact semitones, the quarter tones between them, a dense grid and the take's own pitches."""
+    semitones = 440.0 * 2 ** ((np.arange(12, 128) - 69) / 12)
+    quarter_tones = 440.0 * 2 ** ((np.arange(12, 128) - 68.5) / 12)
+    grid = np.geomspace(16.5, 12000, 20000)
+    return np.concatenate([semitones, quarter_tones, grid, track[1]])
+
+
+def test_doctests():
+    failed, _ = doctest.testmod(pitch)
+    assert failed == 0
+
+
+def test_note_names(frequency):
+    assert pitch.note_names(frequency) == [legacy_frequency_to_note(f) for f in frequency.tolist()]
+
+
+def test_midi_numbers(frequency):
+    with_silence = np.concatenate([[0.0, -1.0], frequency])
+    assert pitch.midi_numbers(with_silence).tolist() == [legacy_freq_to_midi_note(f) for f in with_silence.tolist()]
+
+
+# Float results may differ from the scalar ones in the last bit (NumPy's vectorized pow and log)
+def test_frequency_to_midi(frequency):
+    np.testing.assert_allclose(pitch.frequency_to_midi(frequency), [legacy_linearize(f) for f in frequency.tolist()],
+                               rtol=1e-15, atol=0)
+
+
+def test_midi_to_frequency():
+    midi = np.arange(12, 128)
+    np.testing.assert_allclose(pitch.midi_to_frequency(midi), [legacy_note_to_freq(m) for m in midi.tolist()],
+                               rtol=1e-15, atol=0)
+
+
+def test_midi_note_names():
+    midi = np.arange(12, 128)
+    assert pitch.midi_note_names(midi) == [legacy_note_name(m) for m in midi.tolist()]
+
+
+def test_cents(frequency):
+    cents = pitch.frequency_to_cents(frequency)
+    assert pitch.cents_to_frequency(cents).tolist() == (10 * 2 ** (cents / 1200)).tolist()
+    np.testing.assert_allclose(pitch.cents_to_frequency(cents), frequency, rtol=1e-12, atol=0)
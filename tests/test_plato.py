@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+import pytest
+
+from app.tracks import save_track
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MyOwnCrepe"))
+import plato  # noqa: E402
+
+TRANSCRIBE = plato.transcribe
+
+
+@pytest.fixture
+def tracks(track, tmp_path):
+    """Three stored pitch tracks, so plato only segments and doesn't need the model."""
+    time, frequency, confidence = track
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"take{i}{plato.TRACK_SUFFIX}")
+        save_track(path, {"time": time, "frequency": frequency, "confidence": confidence,
+                          "meta": {"duration": float(time[-1])}})
+        paths.append(path)
+    return paths
+
+
+def run(monkeypatch, *argv):
+    """plato's exit status for a command line."""
+    monkeypatch.setattr(sys, "argv", ["plato.py", *argv])
+    try:
+        plato.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_transcribes_tracks(tracks, tmp_path, monkeypatch):
+    output = str(tmp_path / "out")
+    assert run(monkeypatch, *tracks, "-o", output, "--workers", "2") == 0
+    for path in tracks:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        assert json.load(open(os.path.join(output, stem + ".json")))
+
+
+def transcribe_or_die(path, *args):
+    # The worker exits mid-file, as when it is OOM-killed, which breaks the whole pool
+    if os.path.basename(path) == "take0" + plato.TRACK_SUFFIX:
+        os._exit(1)
+    return TRANSCRIBE(path, *args)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="the patch only reaches fork-started workers")
+def test_dead_worker_fails_its_files(tracks, tmp_path, monkeypatch):
+    monkeypatch.setattr(plato, "transcribe", transcribe_or_die)
+    output = str(tmp_path / "out")
+    assert run(monkeypatch, *tracks, "-o", output, "--workers", "1") == 1
+
+    with open(os.path.join(output, plato.PROGRESS_FILE)) as f:
+        records = {record["file"]: record for record in map(json.loads, f)}
+    assert set(records) == set(tracks)
+    assert records[tracks[0]]["status"] == "error" and "worker process died" in records[tracks[0]]["error"]
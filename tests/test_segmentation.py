@@ -0,0 +1,13 @@
+import numpy as np
+
+from app.model import group_notes
+from benchmarks.bench_segmentation import legacy_group_notes
+
+
+def test_group_notes_matches_loop(track):
+    expected = legacy_group_notes(*track)
+    actual = group_notes(*track)
+    assert len(actual) == len(expected)
+    for a, b in zip(expected, actual):
+        assert (a["name"], a["startTime"], a["duration"]) == (b["name"], b["startTime"], b["duration"])
+        assert np.isclose(a["frequency"], b["frequency"], rtol=1e-12, atol=0)
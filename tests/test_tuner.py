@@ -0,0 +1,26 @@
+import itertools
+
+import numpy as np
+
+from MyOwnCrepe.myCrepe import NoteDetector, linearized_data
+from benchmarks.bench_tuner import legacy_detect_notes
+
+# time_th, ext_time_th, pitch_th, max_slope: low, typical and high slider positions
+SETTINGS = list(itertools.product((0.01, 0.05, 0.2), (0.05, 0.1, 0.3), (0.5, 4.0, 10.0), (1, 5, 50)))
+COLUMNS = (('start_time', 'start'), ('end_time', 'end'), ('midi', 'midi'), ('confidence', 'confidence'))
+# Both sum float32 confidences, in a different order; exp() of the weighted log mean
+# scales the rounding by ln(midi) ~ 4, so long notes can differ by about 1e-6
+RTOL = 1e-5
+
+
+def test_note_detector_matches_detect_notes(track):
+    t, f, c = linearized_data(*track, threshold=0.8)
+    detector = NoteDetector(t, f, c)
+    for time_th, ext_time_th, pitch_th, max_slope in SETTINGS:
+        params = dict(time_th=time_th, ext_time_th=ext_time_th, pitch_th=pitch_th, max_slope=max_slope)
+        expected = legacy_detect_notes(t, f, c, **params)
+        notes = detector.detect(**params)
+        assert len(notes) == len(expected), params
+        for key, name in COLUMNS:
+            np.testing.assert_allclose(getattr(notes, name), [note[key] for note in expected], rtol=RTOL,
+                                       err_msg=str(params))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from app import streaming
+from app.config import AnalysisConfig
+from app.scheduler import activation_to_pitch, frame_audio
+from app.vad import predict_voiced
+from app.viterbi import CENTS_MAPPING, N_STATES
+
+
+def model_predict(audio, sr, config):
+    """
+    Stand-in for run_crepe: a salience bump at the pitch implied by each
+    frame's zero-crossing rate. Like CREPE, each frame only sees its own
+    1024 samples, so a region and a whole-file run agree frame by frame.
+    """
+    frames = frame_audio(audio, sr, config.step_size)
+    crossings = (np.diff(np.signbit(frames), axis=1) != 0).sum(axis=1)
+    cents = 1200 * np.log2(np.maximum(crossings, 1) / (2 * 1024 / 16000) / 10)
+    bins = (cents - CENTS_MAPPING[0]) / (CENTS_MAPPING[1] - CENTS_MAPPING[0])
+    activation = 0.9 * np.exp(-0.5 * ((np.arange(N_STATES)[None, :] - bins[:, None]) / 1.5) ** 2)
+    return activation_to_pitch(activation.astype(np.float32), config.viterbi, config.step_size)
+
+
+@pytest.mark.parametrize("viterbi", [False, True])
+def test_voiced_batch_matches_stream(audio, viterbi, monkeypatch):
+    sr, samples = audio
+    config = AnalysisConfig(vad=True, viterbi=viterbi)
+    time, frequency, confidence, _ = predict_voiced(samples, sr, config, model_predict)
+
+    monkeypatch.setattr(streaming, "run_crepe", model_predict)
+    chunks = list(streaming.stream_pitch(samples, sr, config, chunk_seconds=3))
+    for expected, streamed in zip((time, frequency, confidence), zip(*chunks)):
+        np.testing.assert_array_equal(expected, np.concatenate(streamed))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from app import viterbi
+from app.streaming import decode_chunks
+from benchmarks.synthetic import track_activation
+
+# hmmlearn decodes in O(frames · states²); 20 s of each take is plenty
+FRAMES = 2000
+
+
+@pytest.fixture
+def short_track(track):
+    return tuple(column[:FRAMES] for column in track)
+
+
+@pytest.fixture
+def salience(short_track, seed):
+    return track_activation(short_track, seed)
+
+
+def hmmlearn_path(salience):
+    """The state path of crepe.core.to_viterbi_cents, with its HMM as crepe builds it."""
+    from hmmlearn import hmm
+
+    starting = np.ones(360) / 360
+    xx, yy = np.meshgrid(range(360), range(360))
+    transition = np.maximum(12 - abs(xx - yy), 0)
+    transition = transition / np.sum(transition, axis=1)[:, None]
+    self_emission = 0.1
+    emission = np.eye(360) * self_emission + np.ones(shape=(360, 360)) * ((1 - self_emission) / 360)
+
+    model = hmm.CategoricalHMM(360, starting, transition)
+    model.startprob_, model.transmat_, model.emissionprob_ = starting, transition, emission
+    observations = np.argmax(salience, axis=1)
+    return model.predict(observations.reshape(-1, 1), [len(observations)])
+
+
+def hmmlearn_cents(salience, path):
+    """crepe.core.to_local_average_cents around each frame's state, one frame at a time."""
+    cents = []
+    for row, center in zip(salience, path):
+        start, end = max(0, center - 4), min(len(row), center + 5)
+        cents.append(np.sum(row[start:end] * viterbi.CENTS_MAPPING[start:end]) / np.sum(row[start:end]))
+    return np.array(cents)
+
+
+@pytest.mark.parametrize("use_numba", [False, True])
+def test_matches_hmmlearn(salience, use_numba, monkeypatch):
+    pytest.importorskip("hmmlearn")
+    monkeypatch.setattr(viterbi, "USE_NUMBA", use_numba)
+    path = hmmlearn_path(salience)
+    np.testing.assert_array_equal(path, viterbi.viterbi_path(salience))
+    # Same path; the local averages sum in a different order, so cents agree to rounding
+    np.testing.assert_allclose(viterbi.viterbi_cents(salience), hmmlearn_cents(salience, path), rtol=1e-6)
+
+
+@pytest.mark.parametrize("chunk_frames", [7, 137, 5000])
+def test_decoder_in_chunks_matches_whole(salience, chunk_frames):
+    decoder = viterbi.ViterbiDecoder()
+    cents = [decoder.feed(salience[i:i + chunk_frames]) for i in range(0, len(salience), chunk_frames)]
+    np.testing.assert_array_equal(viterbi.viterbi_cents(salience), np.concatenate(cents + [decoder.finish()]))
+
+
+def test_decode_chunks_skips_gated_frames(short_track, salience):
+    # Frames the silence gate skipped have all-zero activations and stay at 0 Hz
+    time = short_track[0]
+    salience[(time % 7 < 2) | (short_track[2] < 0.1)] = 0
+    analyzed = salience.any(axis=1)
+    expected = np.zeros(len(salience))
+    expected[analyzed] = viterbi.cents_to_frequency(viterbi.viterbi_cents(salience[analyzed]))
+
+    confidence = salience.max(axis=1)
+    bounds = list(range(0, len(salience), 250)) + [len(salience)]
+    chunks = [(time[a:b], None, confidence[a:b], salience[a:b]) for a, b in zip(bounds, bounds[1:])]
+    decoded_time, frequency, decoded_confidence = (np.concatenate(column) for column in zip(*decode_chunks(chunks)))
+    np.testing.assert_array_equal(time, decoded_time)
+    np.testing.assert_array_equal(expected, frequency)
+    np.testing.assert_array_equal(confidence, decoded_confidence)